@@ -1,20 +1,20 @@
-from aiogram import Router, F
+from aiogram import Router, F, flags
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 import random
-from services.conversation_service import ConversationService
-from services.exercise_service import ExerciseService
+from services.conversation_service import get_conversation_service
+from services.conversation_memory import ConversationMemory
+from services.exercise_service import get_exercise_service
+from services.exercise_pool import exercise_pool, GAP_FILL_KEY, QUIZ_KEY
 from reply_keyboard.rep_kb import main_kb
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = Router()
-conversation_service = ConversationService()
-exercise_service = ExerciseService()
 
 
 class ConversationStates(StatesGroup):
@@ -29,8 +29,10 @@ class ExerciseStates(StatesGroup):
 # Диалоговый режим
 @router.message(Command("conversation"))
 @router.message(F.text == "💬 Практика диалога")
+@flags.ai_request
 async def start_conversation_handler(message: Message, state: FSMContext):
     """Начало диалоговой практики"""
+    conversation_service = get_conversation_service()
     if not conversation_service.enabled:
         await message.answer("❌ Диалоговый режим временно недоступен")
         return
@@ -49,13 +51,14 @@ async def start_conversation_handler(message: Message, state: FSMContext):
     )
 
     # Сохраняем историю диалога
-    await state.update_data(
-        conversation_history=[{"role": "assistant", "content": italian_phrase}]
-    )
+    memory = ConversationMemory()
+    memory.add("assistant", italian_phrase)
+    await state.update_data(**memory.to_state())
     await state.set_state(ConversationStates.waiting_for_reply)
 
 
 @router.message(ConversationStates.waiting_for_reply)
+@flags.ai_request
 async def handle_conversation_reply(message: Message, state: FSMContext):
     """Обработка ответа в диалоге"""
     if message.text == "❌ Завершить диалог":
@@ -63,11 +66,11 @@ async def handle_conversation_reply(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    user_data = await state.get_data()
-    conversation_history = user_data.get("conversation_history", [])
+    conversation_service = get_conversation_service()
+    memory = ConversationMemory.from_state(await state.get_data())
 
-    italian_response, russian_translation, new_history, correction = await conversation_service.continue_conversation(
-        message.text, conversation_history
+    italian_response, russian_translation, memory, correction = await conversation_service.continue_conversation(
+        message.text, memory
     )
 
     response_text = f"🇮🇹 Преподаватель: {italian_response}\n📖 Перевод: {russian_translation}"
@@ -76,23 +79,32 @@ async def handle_conversation_reply(message: Message, state: FSMContext):
 
     await message.answer(response_text)
 
-    await state.update_data(conversation_history=new_history)
+    # Сворачиваем старые реплики уже после ответа пользователю
+    memory = await conversation_service.compact_memory(memory)
+    await state.update_data(**memory.to_state())
 
 
 # Упражнения
 @router.message(Command("exercise"))
 @router.message(F.text == "📝 Упражнения")
+@flags.ai_request
 async def send_exercise(message: Message, state: FSMContext):
     """Отправка случайного упражнения"""
-    if not exercise_service.enabled:
+    if not get_exercise_service().enabled:
         await message.answer("❌ Сервис упражнений временно недоступен")
         return
 
     # Случайно выбираем тип упражнения
-    exercise_type = random.choice(["gap_fill", "quiz"])
+    pool_key = random.choice([GAP_FILL_KEY, QUIZ_KEY])
+    exercise_type = pool_key[0]
+
+    # Берем готовое упражнение из пула; если пул пуст - генерируем сразу
+    exercise = await exercise_pool.pop(pool_key)
+    if exercise is None:
+        await message.bot.send_chat_action(message.chat.id, "typing")
+        exercise = await exercise_pool.generate(pool_key)
 
     if exercise_type == "gap_fill":
-        exercise = await exercise_service.generate_gap_exercise()
         if exercise:
             await message.answer(
                 f"🔤 **Упражнение: Заполните пропуски**\n\n"
@@ -109,7 +121,6 @@ async def send_exercise(message: Message, state: FSMContext):
             await message.answer("❌ Не удалось создать упражнение", reply_markup=main_kb())
 
     else:  # quiz
-        exercise = await exercise_service.generate_quiz()
         if exercise:
             # Создаем клавиатуру с вариантами ответов
             kb = ReplyKeyboardMarkup(
@@ -132,6 +143,7 @@ async def send_exercise(message: Message, state: FSMContext):
 
 
 @router.message(ExerciseStates.waiting_for_gap_answer)
+@flags.ai_request
 async def check_gap_answer(message: Message, state: FSMContext):
     """Проверка ответа на упражнение с пропусками"""
     if message.text == "❌ Пропустить упражнение":
@@ -161,6 +173,7 @@ async def check_gap_answer(message: Message, state: FSMContext):
 
 
 @router.message(ExerciseStates.waiting_for_quiz_answer)
+@flags.ai_request
 async def check_quiz_answer(message: Message, state: FSMContext):
     """Проверка ответа на викторину"""
     if message.text == "❌ Пропустить упражнение":
@@ -186,11 +199,13 @@ async def check_quiz_answer(message: Message, state: FSMContext):
 
 # Обработчики для новых пунктов меню
 @router.message(F.text == "💬 Практика диалога (AI)")
+@flags.ai_request
 async def conversation_menu_handler(message: Message, state: FSMContext):
     """Обработчик кнопки 'Практика диалога (AI)' из меню"""
     await start_conversation_handler(message, state)
 
 @router.message(F.text == "📝 Упражнения (AI)")
+@flags.ai_request
 async def exercises_menu_handler(message: Message, state: FSMContext):
     """Обработчик кнопки 'Упражнения (AI)' из меню"""
     await send_exercise(message, state)
@@ -1,14 +1,18 @@
-from aiogram import Router, F
+from aiogram import Router, F, flags
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import html
 from services.openai_service import get_openai_service, is_openai_available
+from services.ai_health import ai_health
+from services.ai_client import ai_client
+from services.ai_admission import ai_admission
 from database.db_helper import db_helper
 from sqlalchemy import select
 from model.model import Vocabulary
 from reply_keyboard.rep_kb import ai_explain_kb, ai_example_kb
+from utils.streaming import stream_to_message
 
 router = Router()
 
@@ -16,7 +20,33 @@ class AIStates(StatesGroup):
     waiting_for_word_explain = State()
     waiting_for_word_example = State()
 
+def ai_status_text() -> str:
+    """
+    Текст статуса AI-сервиса по кэшированному состоянию ai_health
+    (без запроса к API).
+    """
+    service = get_openai_service()
+    status = "✅ Доступен" if service.enabled else "❌ Недоступен"
+
+    response = (
+        f"🤖 **Статус AI-сервиса**\n"
+        f"• Сервис: {status}\n"
+        f"• Ключ API: {'✅ Установлен' if ai_client.api_key else '❌ Отсутствует'}"
+    )
+
+    if service.enabled:
+        health = ai_health.status()
+        response += f"\n• Подключение: {'✅ Работает' if health['available'] else '❌ Ошибка'}"
+        if health['last_checked_at']:
+            response += f"\n• Последняя проверка: {health['last_checked_at']:%d.%m.%Y %H:%M:%S} UTC"
+        queue = ai_admission.stats()
+        response += f"\n• Запросов в работе: {queue['in_flight']}, в очереди: {queue['queued']}"
+
+    return response
+
+
 @router.message(Command("explain"))
+@flags.ai_request
 async def cmd_explain(message: Message, state: FSMContext):
     """
     Команда для объяснения слова с помощью AI.
@@ -44,16 +74,15 @@ async def cmd_explain(message: Message, state: FSMContext):
         # Показываем индикатор набора текста
     await message.bot.send_chat_action(message.chat.id, "typing")
 
+    # Объяснение приходит по частям и дописывается в сообщение
     service = get_openai_service()
-    explanation = await service.explain_word(
-        italian_word=word,
-        russian_translation=""  # AI сам определит перевод
+    explanation = await stream_to_message(
+        message,
+        service.explain_word_stream(word),
+        header=f"🤖 <b>Объяснение слова '{html.escape(word)}'</b>\n\n"
     )
 
-    if explanation:
-        response = f"🤖 **Объяснение слова '{word}'**\n\n{explanation}"
-        await message.answer(html.escape(response))
-    else:
+    if not explanation:
         await message.answer("❌ Не удалось получить объяснение. Попробуйте позже.")
 
 
@@ -64,23 +93,11 @@ async def cmd_ai_status(message: Message):
 
     Показывает текущее состояние подключения к AI-сервису.
     """
-    service = get_openai_service()
-    status = "✅ Доступен" if service.enabled else "❌ Недоступен"
-
-    response = (
-        f"🤖 **Статус AI-сервиса**\n"
-        f"• Сервис: {status}\n"
-        f"• Ключ API: {'✅ Установлен' if service.api_key else '❌ Отсутствует'}"
-    )
-
-    if service.enabled:
-        is_working = await service.check_api_key()
-        response += f"\n• Подключение: {'✅ Работает' if is_working else '❌ Ошибка'}"
-
-    await message.answer(response)
+    await message.answer(ai_status_text())
 
 
 @router.message(Command("example"))
+@flags.ai_request
 async def cmd_example(message: Message):
     """
     Генерация примера предложения с словом.
@@ -142,20 +159,7 @@ async def ai_status_button(message: Message):
     """
     Обработчик кнопки 'Статус AI'.
     """
-    service = get_openai_service()
-    status = "✅ Доступен" if service.enabled else "❌ Недоступен"
-
-    response = (
-        f"🤖 **Статус AI-сервиса**\n"
-        f"• Сервис: {status}\n"
-        f"• Ключ API: {'✅ Установлен' if service.api_key else '❌ Отсутствует'}"
-    )
-
-    if service.enabled:
-        is_working = await service.check_api_key()
-        response += f"\n• Подключение: {'✅ Работает' if is_working else '❌ Ошибка'}"
-
-    await message.answer(response)
+    await message.answer(ai_status_text())
 
 @router.message(F.text == "📝 Пример со словом (AI)")
 async def ai_example_button(message: Message, state: FSMContext):
@@ -176,6 +180,7 @@ async def ai_example_button(message: Message, state: FSMContext):
     await state.set_state(AIStates.waiting_for_word_example)
 
 @router.message(AIStates.waiting_for_word_explain)
+@flags.ai_request
 async def process_word_explain(message: Message, state: FSMContext):
     """
     Обработчик ввода слова для объяснения.
@@ -191,16 +196,16 @@ async def process_word_explain(message: Message, state: FSMContext):
 
     await message.bot.send_chat_action(message.chat.id, "typing")
 
+    # Объяснение приходит по частям и дописывается в сообщение
     service = get_openai_service()
-    explanation = await service.explain_word(
-        italian_word=word,
-        russian_translation=""  # AI сам определит
+    explanation = await stream_to_message(
+        message,
+        service.explain_word_stream(word),
+        header=f"🤖 <b>Объяснение слова '{html.escape(word)}'</b>\n\n",
+        reply_markup=main_kb()
     )
 
-    if explanation:
-        response = f"🤖 **Объяснение слова '{word}'**\n\n{explanation}"
-        await message.answer(response, reply_markup=main_kb(), parse_mode="Markdown")
-    else:
+    if not explanation:
         await message.answer(
             "❌ Не удалось получить объяснение. Попробуйте позже.",
             reply_markup=main_kb()
@@ -210,6 +215,7 @@ async def process_word_explain(message: Message, state: FSMContext):
 
 
 @router.message(AIStates.waiting_for_word_example)
+@flags.ai_request
 async def process_word_example(message: Message, state: FSMContext):
     """
     Обработчик ввода слова для генерации примера.
@@ -1,16 +1,15 @@
-import random
-
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from inline_keyboard.inline_kb_w_call_back import theme_keyboard
 from reply_keyboard.rep_kb import main_kb
 from aiogram.filters import Command
 from config_data.config import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.functions import get_all_themes, get_words_by_theme_id, get_all_idioms
+from database.functions import get_words_by_theme_id
 from aiogram.fsm.context import FSMContext
 from utils.states import Quiz
 from services.admin_functions import format_word_list
+from services.theme_cache import theme_cache
+from services.idiom_service import idiom_service
 
 
 router = Router()
@@ -88,8 +87,10 @@ async def cmd_idiom(
     logger.info('idioms_started')
 
     try:
-        idioms = await get_all_idioms(session)
-        current_idiom = random.choice(idioms)
+        current_idiom = await idiom_service.get_phrase_of_the_day(session)
+        if current_idiom is None:
+            await message.answer("Сегодня фразы нет")
+            return
         await message.answer(f'{current_idiom.italian_idiom} - {current_idiom.rus_idiom}')
     except Exception as e:
         logger.error(f"Error in cmd_idiom: {e}")
@@ -106,8 +107,7 @@ async def cmd_learn(
     logger.info('state - no_quiz is set')
 
     try:
-        themes = await get_all_themes(session)
-        keyboard = await theme_keyboard(themes)
+        keyboard = await theme_cache.get_keyboard(session)
         await message.answer('Выберите тему',
                            reply_markup=keyboard)
     except Exception as e:
@@ -126,8 +126,7 @@ async def cmd_train(
     logger.info('state - quiz_start is set')
 
     try:
-        themes = await get_all_themes(session)
-        keyboard = await theme_keyboard(themes)
+        keyboard = await theme_cache.get_keyboard(session)
         await message.answer(
             'На какую тему будем тренироваться? Выберите из тем ниже',
             reply_markup=keyboard
@@ -1,21 +1,70 @@
-import random
 from aiogram import Router, F
 from aiogram.dispatcher.dispatcher import SkipHandler
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
-from  sqlalchemy import select
 from config_data.config import logger
-from database.functions import get_words_by_theme_id
 from inline_keyboard.inline_kb_w_call_back import (
     create_quiz_keyboard,
     create_next_question_keyboard,
-    generate_quiz_options
 )
 from utils.states import Quiz
-from services.user_service import UserService
-from model.model import User, Vocabulary, UserWordProgress
+from services.user_service import UserService, WordStatus
+from services.quiz_pool import quiz_pool, QuizQuestion
+from services.word_selector import word_selector
+from model.model import User, Vocabulary
+
+# "Тема" в callback_data вопросов режима повторения
+REVIEW_THEME = "review"
+
+STATUS_BADGES = {
+    'new': '🔴 Новое слово',
+    'learning': '🟡 Изучается',
+    'learned': '🟢 Выучено',
+    'mastered': '🔵 Освоено'
+}
+
+
+def question_text(
+        question: QuizQuestion,
+        progress: dict[int, WordStatus],
+        title: str = "Выберите правильный перевод слова:"
+) -> str:
+    """Текст вопроса со статусом слова из карты прогресса"""
+    text = f"{title}\n\n<b>{question.italian}</b>"
+    word = progress.get(question.word_id)
+    if word is not None:
+        text += f"\n{STATUS_BADGES.get(word.status, '')}"
+    return text
+
+
+def stored_progress(user_data: dict) -> dict[int, WordStatus] | None:
+    """Карта прогресса из состояния: FSM хранит JSON, WordStatus там - список"""
+    progress = user_data.get('word_progress')
+    if progress is None:
+        return None
+    return {word_id: WordStatus(*status) for word_id, status in progress.items()}
+
+
+async def get_progress_map(
+        state: FSMContext,
+        session: AsyncSession,
+        user_id: int,
+        theme_id: int
+) -> dict[int, WordStatus]:
+    """
+    Карта прогресса по словам темы из состояния квиза.
+    Если ее нет (например, квиз начат до обновления бота) -
+    загружается одним запросом и сохраняется в состоянии.
+    """
+    user_data = await state.get_data()
+    progress = stored_progress(user_data)
+    if progress is None or user_data.get('progress_theme_id') != theme_id:
+        progress = await UserService.get_theme_progress(session, user_id, theme_id)
+        await state.update_data(word_progress=progress, progress_theme_id=theme_id)
+    return progress
 
 async def quiz_word_by_theme_from_next(
         callback: CallbackQuery,
@@ -27,27 +76,32 @@ async def quiz_word_by_theme_from_next(
     """Создаёт следующий вопрос, когда пользователь нажал 'Следующий вопрос'"""
     try:
         logger.info(f"Starting next quiz question for theme_id={theme_id}")
-        words = await get_words_by_theme_id(session, theme_id)
-        if not words:
+        progress = await get_progress_map(state, session, db_user.id, theme_id)
+        previous_word_id = (await state.get_data()).get('current_word_id')
+        # Слабые слова попадаются чаще, прошлое слово не повторяется подряд
+        question = await quiz_pool.get_question(
+            session,
+            theme_id,
+            pick=lambda pool: word_selector.pick(db_user.id, theme_id, pool, progress, previous_word_id)
+        )
+        if not question:
             await callback.message.answer("В этой теме пока нет слов для тренировки 😔")
             return
 
-        current_word = random.choice(words)
-        possible_answers = generate_quiz_options(words, current_word)
         keyboard = create_quiz_keyboard(
-            possible_answers=possible_answers,
-            correct_answer=current_word.rus_word,
+            possible_answers=question.options,
+            correct_answer=question.russian,
             theme_id=str(theme_id),
         )
 
         await state.update_data(
-            correct_answer=current_word.rus_word,
-            italian_word=current_word.italian_word,
-            current_word_id=current_word.id
+            correct_answer=question.russian,
+            italian_word=question.italian,
+            current_word_id=question.word_id
         )
 
         await callback.message.answer(
-            f"Выберите правильный перевод слова:\n\n<b>{current_word.italian_word}</b>",
+            question_text(question, progress),
             reply_markup=keyboard,
             parse_mode="HTML"
         )
@@ -98,57 +152,47 @@ async def quiz_word_by_theme(
         theme_id = int(callback.data)
         logger.info(f"Starting quiz for theme_id={theme_id}")
 
-        words = await get_words_by_theme_id(session, theme_id)
-        if not words:
+        # Прогресс по всем словам темы - одним запросом на весь квиз,
+        # дальше он обновляется в состоянии по ответам
+        progress = await UserService.get_theme_progress(session, user.id, theme_id)
+        # Веса слов строятся заново из свежего прогресса
+        word_selector.discard(user.id, theme_id)
+
+        # Формируем вопрос из пула темы (без запросов к БД)
+        question = await quiz_pool.get_question(
+            session,
+            theme_id,
+            pick=lambda pool: word_selector.pick(user.id, theme_id, pool, progress)
+        )
+        if not question:
             await callback.message.answer("В этой теме пока нет слов для тренировки 😔")
             return
 
-        # Формируем вопрос
-        current_word = random.choice(words)
-        possible_answers = generate_quiz_options(words, current_word)
         keyboard = create_quiz_keyboard(
-            possible_answers=possible_answers,
-            correct_answer=current_word.rus_word,
+            possible_answers=question.options,
+            correct_answer=question.russian,
             theme_id=callback.data,
         )
 
         # Инициализируем данные сессии при первом вопросе
-        user_data = await state.get_data()
+        # и сохраняем ID текущего слова для отслеживания прогресса
         await state.update_data(
             session_started=True,
             session_start_time=UserService._now(),
+            session_type='quiz',
             correct_count=0,
             wrong_count=0,
-            theme_id=theme_id
-        )
-
-        # Сохраняем ID текущего слова для отслеживания прогресса
-        await state.update_data(
-            correct_answer=current_word.rus_word,
-            italian_word=current_word.italian_word,
-            current_word_id=current_word.id  # ← ВАЖНО! Сохраняем ID
-        )
-        progress_result = await session.execute(
-            select(UserWordProgress).where(
-                UserWordProgress.user_id == user.id,  # ← используем user.id
-                UserWordProgress.word_id == current_word.id
-            )
+            theme_id=theme_id,
+            correct_answer=question.russian,
+            italian_word=question.italian,
+            current_word_id=question.word_id,  # ← ВАЖНО! Сохраняем ID
+            word_progress=progress,
+            progress_theme_id=theme_id
         )
-        progress = progress_result.scalar_one_or_none()
-
-        status_text = ""
-        if progress:
-            status_map = {
-                'new': '🔴 Новое слово',
-                'learning': '🟡 Изучается',
-                'learned': '🟢 Выучено',
-                'mastered': '🔵 Освоено'
-            }
-            status_text = f"\n{status_map.get       (progress.status, '')}"
 
         # Отправляем вопрос
         await callback.message.answer(
-            f"Выберите правильный перевод слова:\n\n<b>{current_word.italian_word}</b>",
+            question_text(question, progress),
             reply_markup=keyboard,
             parse_mode="HTML"
         )
@@ -198,7 +242,7 @@ async def check_answer(
         current_word_id = user_data.get('current_word_id')
 
         logger.info(f"DEBUG: current_word_id={current_word_id}, type={type(current_word_id)}")
-        logger.info(f"DEBUG: db_user.id={db_user.id}, is_correct={is_correct}")
+        logger.info(f"DEBUG: user.id={user.id}, is_correct={is_correct}")
 
         # Обновляем счетчики сессии
         correct_count = user_data.get('correct_count', 0)
@@ -214,32 +258,42 @@ async def check_answer(
                 f"<i>{italian_word}</i> = <b>{correct_answer}</b>"
             )
 
-        # Сохраняем обновленные счетчики
-        await state.update_data(
-            correct_count=correct_count,
-            wrong_count=wrong_count
-        )
+        # Обновленные счетчики (и карта прогресса) сохраняются в состоянии одной записью
+        state_update = {'correct_count': correct_count, 'wrong_count': wrong_count}
 
         # Сохраняем прогресс по слову (если есть word_id)
         if current_word_id:
             logger.info(f"DEBUG: Calling update_word_progress...")
             try:
-                await UserService.update_word_progress(
+                word_update = await UserService.update_word_progress(
                     session=session,
-                    user_id=db_user.id,
+                    user_id=user.id,
                     word_id=current_word_id,
-                    is_correct=is_correct
+                    is_correct=is_correct,
+                    user=user
                 )
                 logger.info(
-                    f"Progress saved: user={db_user.id}, word={current_word_id}, "
+                    f"Progress saved: user={user.id}, word={current_word_id}, "
                     f"correct={is_correct}"
                 )
+                progress = stored_progress(user_data)
+                if progress is not None:
+                    UserService.apply_progress_update(progress, current_word_id, word_update)
+                    state_update['word_progress'] = progress
+                    if user_data.get('theme_id') is not None:
+                        word_selector.update(
+                            user.id, user_data['theme_id'], current_word_id, progress[current_word_id]
+                        )
+                if word_update.old_status is not None and word_update.status != word_update.old_status:
+                    response += f"\n\nСтатус слова: {STATUS_BADGES.get(word_update.status, '')}"
             except Exception as e:
                 logger.error(f"Error saving word progress: {e}")
         else:
             logger.warning("current_word_id not found in state")
             logger.warning(f"DEBUG: Available keys in state: {user_data.keys()}")
 
+        await state.update_data(**state_update)
+
         # Показываем статистику сессии
         total = correct_count + wrong_count
         accuracy = (correct_count / total * 100) if total > 0 else 0
@@ -265,6 +319,96 @@ async def check_answer(
         logger.error(f"Error in check_answer: {e}", exc_info=True)
         await callback.message.answer("Произошла ошибка при обработке ответа")
 
+async def send_review_question(
+        message: Message,
+        state: FSMContext,
+        session: AsyncSession,
+        user: User
+) -> bool:
+    """
+    Отправить вопрос по самому просроченному слову из очереди повторения.
+
+    Returns:
+        False, если повторять нечего
+    """
+    words = await UserService.get_words_for_review(session, user.id, limit=1)
+    question = None
+    if words:
+        word = words[0]
+        question = await quiz_pool.get_word_question(session, word.theme_id, word.id)
+
+    if not question:
+        await message.answer(
+            "🎉 Все слова повторены! Следующие появятся по расписанию.",
+            reply_markup=create_next_question_keyboard(REVIEW_THEME)
+        )
+        return False
+
+    keyboard = create_quiz_keyboard(
+        possible_answers=question.options,
+        correct_answer=question.russian,
+        theme_id=REVIEW_THEME,
+    )
+
+    await state.update_data(
+        correct_answer=question.russian,
+        italian_word=question.italian,
+        current_word_id=question.word_id
+    )
+
+    # Слова повторения из разных тем: в карте - те, на которые уже ответили
+    progress = stored_progress(await state.get_data()) or {}
+    await message.answer(
+        question_text(question, progress, "🔁 Повторение. Выберите правильный перевод слова:"),
+        reply_markup=keyboard,
+        parse_mode="HTML"
+    )
+    return True
+
+
+@quiz_router.message(F.text == "🔁 Повторение")
+@quiz_router.message(Command("review"))
+async def start_review(
+        message: Message,
+        state: FSMContext,
+        session: AsyncSession,
+        db_user: User
+):
+    """Квиз по словам, которым пора на повторение (SM-2)"""
+    try:
+        await state.set_state(Quiz.review)
+        await state.update_data(
+            session_started=True,
+            session_start_time=UserService._now(),
+            session_type='review',
+            correct_count=0,
+            wrong_count=0,
+            theme_id=None,
+            word_progress={},
+            progress_theme_id=REVIEW_THEME
+        )
+        await send_review_question(message, state, session, db_user)
+    except Exception as e:
+        logger.error(f"Error in start_review: {e}", exc_info=True)
+        await message.answer("Произошла ошибка при запуске повторения")
+
+
+@quiz_router.callback_query(F.data == f"next_{REVIEW_THEME}")
+async def next_review_question(
+        callback: CallbackQuery,
+        state: FSMContext,
+        session: AsyncSession,
+        db_user: User
+):
+    """Следующий вопрос в режиме повторения"""
+    try:
+        await send_review_question(callback.message, state, session, db_user)
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Error in next_review_question: {e}", exc_info=True)
+        await callback.message.answer("Ошибка при переходе к следующему вопросу")
+
+
 @quiz_router.callback_query(F.data.startswith("next_"))
 async def next_question(
         callback: CallbackQuery,
@@ -321,11 +465,12 @@ async def end_quiz_session(
             await UserService.save_training_session(
                 session=session,
                 user_id=db_user.id,
-                session_type='quiz',
+                session_type=user_data.get('session_type', 'quiz'),
                 theme_id=theme_id,
                 correct_answers=correct_count,
                 wrong_answers=wrong_count,
-                duration_seconds=duration_seconds
+                duration_seconds=duration_seconds,
+                user=db_user
             )
             logger.info(f"✓ Training session saved: {correct_count} correct, {wrong_count} wrong")
 
@@ -0,0 +1,87 @@
+"""
+Массовая загрузка данных в PostgreSQL.
+
+Строки пишутся через COPY (asyncpg copy_records_to_table) в текущей
+транзакции сессии; если драйвер не asyncpg - пачками insert().values().
+"""
+import time
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import insert, Table
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config_data.config import logger
+from model.model import Theme
+
+# Размер пачки для insert().values()
+BATCH_SIZE = 1000
+
+
+async def upsert_themes(session: AsyncSession, names: Sequence[str]) -> dict[str, int]:
+    """
+    Создать недостающие темы одним запросом.
+
+    Returns:
+        dict {название темы: id} для всех переданных тем
+    """
+    # Повтор имени в одном INSERT ... ON CONFLICT DO UPDATE недопустим
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    stmt = pg_insert(Theme).values([{"name": name} for name in names])
+    # DO UPDATE (а не DO NOTHING), чтобы RETURNING вернул и существующие темы
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Theme.name],
+        set_={"name": stmt.excluded.name},
+    ).returning(Theme.id, Theme.name)
+
+    result = await session.execute(stmt)
+    return {row.name: row.id for row in result}
+
+
+async def copy_rows(
+    session: AsyncSession,
+    table: Table,
+    columns: Sequence[str],
+    rows: Iterable[tuple[Any, ...]]
+) -> int:
+    """
+    Загрузить строки в таблицу в транзакции сессии.
+
+    Args:
+        session: Database session
+        table: Таблица (Model.__table__)
+        columns: Имена колонок в порядке значений в строках
+        rows: Кортежи значений
+
+    Returns:
+        Количество загруженных строк
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    started = time.monotonic()
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    if hasattr(driver_connection, "copy_records_to_table"):
+        await driver_connection.copy_records_to_table(
+            table.name, records=rows, columns=list(columns)
+        )
+    else:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            await session.execute(
+                insert(table).values([dict(zip(columns, row)) for row in batch])
+            )
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Loaded {len(rows)} rows into {table.name} in {elapsed:.2f}s "
+        f"({len(rows) / elapsed if elapsed else len(rows):.0f} rows/s)"
+    )
+    return len(rows)
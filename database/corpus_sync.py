@@ -0,0 +1,298 @@
+"""
+Инкрементальная синхронизация корпуса (vocabulary.json, italian_idioms.json) с БД.
+
+Для каждого файла в таблице corpus_version хранится хэш содержимого
+и хэши разделов (тем). При старте:
+- хэш файла совпал с примененным - ничего не делаем;
+- иначе сравниваем только изменившиеся темы с БД по записям
+  и применяем вставки, обновления и удаления.
+
+Синхронизацию одновременно выполняет только один процесс (lock_sync):
+реплики, стартовавшие вместе, ждут блокировку и затем читают уже
+обновленную версию корпуса.
+
+Запись определяется итальянским словом внутри темы (и номером повтора,
+если слово в теме встречается несколько раз) - при исправлении перевода
+строка обновляется, и прогресс пользователей по слову сохраняется.
+При удалении слова прогресс по нему удаляется каскадно, и в той же
+транзакции пересчитывается total_words_learned у затронутых пользователей.
+"""
+import hashlib
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config_data.config import logger
+from database.bulk_import import copy_rows, upsert_themes
+from model.model import CorpusVersion, Idiom, Theme, TrainingSession, User, UserWordProgress, Vocabulary
+from services.user_service import LEARNED_STATUSES
+from utils.json_stream import iter_array_items, iter_object_items
+
+VOCABULARY = "vocabulary"
+IDIOMS = "idioms"
+
+# Ключ pg_advisory_xact_lock синхронизации корпуса
+SYNC_LOCK_KEY = 0x636F7270
+
+# Ключ записи: (оригинал, номер повтора внутри раздела)
+EntryKey = tuple[str, int]
+
+
+@dataclass
+class SyncResult:
+    """Итог синхронизации одного файла"""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+
+def file_hash(path: str) -> str:
+    """sha256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def section_hash(entries: list[tuple[str, str]]) -> str:
+    """Отпечаток раздела: упорядоченный список пар (оригинал, перевод)"""
+    return hashlib.sha256(json.dumps(entries, ensure_ascii=False).encode()).hexdigest()
+
+
+def _keyed(entries: Iterable[tuple[str, str, int | None]]) -> dict[EntryKey, tuple[str, int | None]]:
+    """
+    Пронумеровать повторы оригинала: {(оригинал, n): (перевод, id строки)}.
+    Порядок повторов - порядок в файле / по id в БД.
+    """
+    seen: Counter[str] = Counter()
+    keyed = {}
+    for original, translation, row_id in entries:
+        keyed[(original, seen[original])] = (translation, row_id)
+        seen[original] += 1
+    return keyed
+
+
+def _diff(
+    wanted: dict[EntryKey, tuple[str, None]],
+    current: dict[EntryKey, tuple[str, int]]
+) -> tuple[list[EntryKey], list[tuple[int, str]], list[int]]:
+    """
+    Returns:
+        (ключи для вставки, [(id, новый перевод)] для обновления, id для удаления)
+    """
+    to_insert = [key for key in wanted if key not in current]
+    to_update = [
+        (row_id, wanted[key][0])
+        for key, (translation, row_id) in current.items()
+        if key in wanted and wanted[key][0] != translation
+    ]
+    to_delete = [row_id for key, (_, row_id) in current.items() if key not in wanted]
+    return to_insert, to_update, to_delete
+
+
+async def lock_sync(session: AsyncSession) -> None:
+    """
+    Дождаться, пока другие процессы закончат синхронизацию.
+    Блокировка снимается при коммите или откате транзакции, поэтому
+    вызывать - первым запросом транзакции, до чтения corpus_version.
+    """
+    await session.execute(select(func.pg_advisory_xact_lock(SYNC_LOCK_KEY)))
+
+
+async def get_applied_hashes(session: AsyncSession) -> dict[str, str]:
+    """Хэши примененных файлов: {имя корпуса: content_hash}"""
+    result = await session.execute(select(CorpusVersion.name, CorpusVersion.content_hash))
+    return {name: content_hash for name, content_hash in result}
+
+
+async def _get_version(session: AsyncSession, name: str) -> CorpusVersion | None:
+    result = await session.execute(select(CorpusVersion).where(CorpusVersion.name == name))
+    return result.scalar_one_or_none()
+
+
+async def _save_version(
+    session: AsyncSession,
+    name: str,
+    content_hash: str,
+    section_hashes: dict[str, str],
+    entries: int
+) -> None:
+    values = {
+        "name": name,
+        "content_hash": content_hash,
+        "section_hashes": section_hashes,
+        "entries": entries,
+    }
+    stmt = insert(CorpusVersion).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CorpusVersion.name],
+        set_={
+            **{key: getattr(stmt.excluded, key) for key in values if key != "name"},
+            "applied_at": func.now(),
+        },
+    )
+    await session.execute(stmt)
+
+
+async def sync_vocabulary(session: AsyncSession, path: str) -> SyncResult:
+    """Синхронизировать темы и слова с vocabulary.json"""
+    content_hash = file_hash(path)
+    version = await _get_version(session, VOCABULARY)
+    if version is not None and version.content_hash == content_hash:
+        return SyncResult(skipped=True)
+
+    started = time.monotonic()
+    file_themes: dict[str, list[tuple[str, str]]] = {}
+    with open(path, 'r', encoding='utf-8') as file:
+        for theme_name, words in iter_object_items(file):
+            file_themes.setdefault(theme_name, []).extend(
+                (word['italian'], word['russian']) for word in words
+            )
+
+    section_hashes = {name: section_hash(entries) for name, entries in file_themes.items()}
+    applied_hashes = version.section_hashes if version is not None else {}
+
+    result = await session.execute(select(Theme.id, Theme.name))
+    db_themes = {row.name: row.id for row in result}
+
+    # Темы, которые нужно сравнить с БД: измененные в файле и удаленные из него
+    changed = [name for name, digest in section_hashes.items() if applied_hashes.get(name) != digest]
+    removed = [name for name in db_themes if name not in file_themes]
+
+    theme_ids = {**db_themes, **await upsert_themes(session, changed)}
+
+    current_rows: dict[int, list[tuple[str, str, int]]] = {}
+    compare_ids = [theme_ids[name] for name in changed + removed]
+    if compare_ids:
+        rows = await session.execute(
+            select(Vocabulary.id, Vocabulary.theme_id, Vocabulary.italian_word, Vocabulary.rus_word)
+            .where(Vocabulary.theme_id.in_(compare_ids))
+            .order_by(Vocabulary.id)
+        )
+        for row in rows:
+            current_rows.setdefault(row.theme_id, []).append((row.italian_word, row.rus_word, row.id))
+
+    insert_rows: list[tuple[str, str, int]] = []
+    update_rows: list[dict] = []
+    delete_ids: list[int] = []
+
+    for name in changed + removed:
+        theme_id = theme_ids[name]
+        wanted = _keyed((it, ru, None) for it, ru in file_themes.get(name, []))
+        current = _keyed(current_rows.get(theme_id, []))
+        to_insert, to_update, to_delete = _diff(wanted, current)
+
+        insert_rows.extend((key[0], wanted[key][0], theme_id) for key in to_insert)
+        update_rows.extend({"id": row_id, "rus_word": translation} for row_id, translation in to_update)
+        delete_ids.extend(to_delete)
+
+    if delete_ids:
+        # Прогресс пользователей по удаленным словам удаляется каскадно
+        affected_users = (await session.scalars(
+            select(UserWordProgress.user_id)
+            .where(
+                UserWordProgress.word_id.in_(delete_ids),
+                UserWordProgress.status.in_(LEARNED_STATUSES),
+            )
+            .distinct()
+        )).all()
+        await session.execute(delete(Vocabulary).where(Vocabulary.id.in_(delete_ids)))
+        if affected_users:
+            await _recount_learned(session, affected_users)
+    if update_rows:
+        await session.execute(update(Vocabulary), update_rows)
+    await copy_rows(session, Vocabulary.__table__, ('italian_word', 'rus_word', 'theme_id'), insert_rows)
+
+    if removed:
+        # Удаленные из файла темы без слов и без истории тренировок
+        await session.execute(
+            delete(Theme).where(
+                Theme.name.in_(removed),
+                ~exists().where(Vocabulary.theme_id == Theme.id),
+                ~exists().where(TrainingSession.theme_id == Theme.id),
+            )
+        )
+
+    sync = SyncResult(inserted=len(insert_rows), updated=len(update_rows), deleted=len(delete_ids))
+
+    await _save_version(
+        session, VOCABULARY, content_hash, section_hashes,
+        sum(len(entries) for entries in file_themes.values())
+    )
+
+    logger.info(
+        f"Vocabulary sync: {len(changed)} changed and {len(removed)} removed themes, "
+        f"+{sync.inserted} ~{sync.updated} -{sync.deleted} words "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return sync
+
+
+async def _recount_learned(session: AsyncSession, user_ids: Iterable[int]) -> None:
+    """Пересчитать total_words_learned по оставшемуся прогрессу"""
+    learned = (
+        select(func.count())
+        .where(
+            UserWordProgress.user_id == User.id,
+            UserWordProgress.status.in_(LEARNED_STATUSES),
+        )
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(User)
+        .where(User.id.in_(list(user_ids)))
+        .values(total_words_learned=learned)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def sync_idioms(session: AsyncSession, path: str) -> SyncResult:
+    """Синхронизировать идиомы с italian_idioms.json"""
+    content_hash = file_hash(path)
+    version = await _get_version(session, IDIOMS)
+    if version is not None and version.content_hash == content_hash:
+        return SyncResult(skipped=True)
+
+    started = time.monotonic()
+    with open(path, 'r', encoding='utf-8') as file:
+        entries = [(item['italian'], item['russian']) for item in iter_array_items(file)]
+
+    rows = await session.execute(
+        select(Idiom.id, Idiom.italian_idiom, Idiom.rus_idiom).order_by(Idiom.id)
+    )
+    current = _keyed((row.italian_idiom, row.rus_idiom, row.id) for row in rows)
+    wanted = _keyed((it, ru, None) for it, ru in entries)
+    to_insert, to_update, to_delete = _diff(wanted, current)
+
+    if to_delete:
+        await session.execute(delete(Idiom).where(Idiom.id.in_(to_delete)))
+    if to_update:
+        await session.execute(
+            update(Idiom),
+            [{"id": row_id, "rus_idiom": translation} for row_id, translation in to_update]
+        )
+    await copy_rows(
+        session, Idiom.__table__, ('italian_idiom', 'rus_idiom'),
+        ((key[0], wanted[key][0]) for key in to_insert)
+    )
+
+    await _save_version(session, IDIOMS, content_hash, {}, len(entries))
+
+    sync = SyncResult(inserted=len(to_insert), updated=len(to_update), deleted=len(to_delete))
+    logger.info(
+        f"Idioms sync: +{sync.inserted} ~{sync.updated} -{sync.deleted} "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return sync
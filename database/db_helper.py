@@ -1,4 +1,5 @@
 from contextlib import asynccontextmanager
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from db_config.db_config import settings
 
@@ -30,6 +31,86 @@ class DatabaseHelper:
         finally:
             await session.close()
 
+    @asynccontextmanager
+    async def get_lazy_session(self) -> "LazySession":
+        """
+        Сессия, которая создается только при первом обращении.
+        Коммит выполняется, только если в сессии были изменения.
+        """
+        lazy_session = LazySession(self.session_factory)
+        try:
+            yield lazy_session
+            await lazy_session.finish()
+        except Exception as e:
+            await lazy_session.abort()
+            raise e
 
-db_helper = DatabaseHelper()
 
+class LazySession:
+    """
+    Прокси над AsyncSession для middleware.
+
+    Настоящая сессия (и соединение из пула) создается при первом обращении
+    к любому атрибуту. Если обработчик не трогал БД - пул не используется вовсе.
+    При завершении коммит выполняется только если были flush или DML-запросы,
+    иначе сессия просто закрывается.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+        self._has_writes = False
+
+    @property
+    def is_started(self) -> bool:
+        """Была ли создана настоящая сессия"""
+        return self._session is not None
+
+    def _get_session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+            sync_session = self._session.sync_session
+            event.listen(sync_session, "after_flush", self._on_flush)
+            event.listen(sync_session, "do_orm_execute", self._on_execute)
+            event.listen(sync_session, "after_commit", self._on_transaction_end)
+            event.listen(sync_session, "after_rollback", self._on_transaction_end)
+        return self._session
+
+    def _on_flush(self, session, flush_context) -> None:
+        self._has_writes = True
+
+    def _on_execute(self, orm_execute_state) -> None:
+        if not orm_execute_state.is_select:
+            self._has_writes = True
+
+    def _on_transaction_end(self, session) -> None:
+        self._has_writes = False
+
+    def _has_pending_changes(self) -> bool:
+        session = self._session
+        return bool(self._has_writes or session.new or session.dirty or session.deleted)
+
+    def __getattr__(self, name):
+        return getattr(self._get_session(), name)
+
+    async def finish(self) -> None:
+        """Закоммитить изменения (если они есть) и закрыть сессию"""
+        if self._session is None:
+            return
+        try:
+            if self._has_pending_changes():
+                await self._session.commit()
+        finally:
+            await self._session.close()
+
+    async def abort(self) -> None:
+        """Откатить транзакцию и закрыть сессию"""
+        if self._session is None:
+            return
+        try:
+            await self._session.rollback()
+        finally:
+            await self._session.close()
+
+
+db_helper = DatabaseHelper()
@@ -1,70 +1,103 @@
+import asyncio
 import os
-from database.functions import insert_data_from_json, insert_idioms_from_json
+from database.corpus_sync import (
+    IDIOMS,
+    VOCABULARY,
+    get_applied_hashes,
+    lock_sync,
+    sync_idioms,
+    sync_vocabulary,
+)
 from database.db_helper import db_helper
-from sqlalchemy import select, func
-from model.model import Vocabulary, Idiom
 from config_data.config import logger  # Оставляем старый импорт логгера
+from services.quiz_pool import quiz_pool
+from services.theme_cache import theme_cache
+from services.idiom_service import idiom_service
+
+
+def _invalidate_caches(vocabulary_changed: bool, idioms_changed: bool) -> None:
+    """Кэши перезагрузятся при следующем обращении"""
+    if vocabulary_changed:
+        quiz_pool.invalidate()
+        theme_cache.invalidate()
+    if idioms_changed:
+        idiom_service.invalidate()
+
+
+async def start_import() -> dict[str, str] | None:
+    """
+    Синхронизация словаря и идиом из файлов с базой данных.
+    Если файлы не менялись с прошлого применения - стоит одной
+    проверки хэша на файл.
+
+    Returns:
+        Хэши примененных файлов (начальное состояние для watch_corpus)
+        или None, если файлов нет
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    vocab_path = os.path.join(base_dir, "database", "vocabulary.json")
+    idiom_path = os.path.join(base_dir, "database", "italian_idioms.json")
+
+    # Проверяем что файлы существуют
+    if not os.path.exists(vocab_path):
+        logger.error(f"Vocabulary file not found: {vocab_path}")
+        return
 
+    if not os.path.exists(idiom_path):
+        logger.error(f"Idioms file not found: {idiom_path}")
+        return
 
-async def check_if_data_exists() -> bool:
-    """Проверить есть ли данные в БД"""
     async with db_helper.get_session() as session:
         try:
-            # Проверяем есть ли хоть одно слово
-            result = await session.execute(select(func.count()).select_from(Vocabulary))
-            vocab_count = result.scalar()
-
-            # Проверяем есть ли хоть одна идиома
-            result = await session.execute(select(func.count()).select_from(Idiom))
-            idiom_count = result.scalar()
-
-            has_data = vocab_count > 0 and idiom_count > 0
-            logger.info(f"Database check: {vocab_count} words, {idiom_count} idioms")
-
-            return has_data
+            # Реплики синхронизируют по очереди; версии корпуса
+            # читаются уже после получения блокировки
+            await lock_sync(session)
+            vocab_result = await sync_vocabulary(session, vocab_path)
+            idiom_result = await sync_idioms(session, idiom_path)
+            applied = await get_applied_hashes(session)
+
+            # Вся синхронизация - одна транзакция
+            await session.commit()
         except Exception as e:
-            logger.warning(f"Error checking data existence: {e}")
-            return False
-
-
-async def start_import():
-    """Вызов функции импорта из файла в базу данных"""
-
-    # Проверяем, нужен ли импорт
-    if await check_if_data_exists():
-        logger.info("✓ Database already contains data, skipping import")
-        return
-
-    logger.info("Database is empty, starting import...")
+            logger.error(f"✗ Error during import: {str(e)}", exc_info=True)
+            raise
 
-    async with db_helper.get_session() as session:
-        try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            vocab_path = os.path.join(base_dir, "database", "vocabulary.json")
-            idiom_path = os.path.join(base_dir, "database", "italian_idioms.json")
+    if vocab_result.skipped and idiom_result.skipped:
+        logger.info("✓ Corpus is up to date, skipping import")
+        return applied
 
-            # Проверяем что файлы существуют
-            if not os.path.exists(vocab_path):
-                logger.error(f"Vocabulary file not found: {vocab_path}")
-                return
+    _invalidate_caches(vocab_result.changed, idiom_result.changed)
 
-            if not os.path.exists(idiom_path):
-                logger.error(f"Idioms file not found: {idiom_path}")
-                return
+    logger.info("✓ Corpus sync completed successfully!")
+    return applied
 
-            logger.info(f"Starting vocabulary import from {vocab_path}...")
-            await insert_data_from_json(session, vocab_path)
 
-            logger.info(f"Starting idioms import from {idiom_path}...")
-            await insert_idioms_from_json(session, idiom_path)
+async def watch_corpus(applied: dict[str, str] | None, interval: float = 300.0):
+    """
+    Фоновая задача: сбросить кэши, если корпус синхронизировала
+    другая реплика (она сбрасывает только свои кэши).
 
-            logger.info("✓ Data import completed successfully!")
+    Args:
+        applied: Хэши, с которыми загружены кэши этого процесса (результат start_import)
+        interval: Период проверки в секундах
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with db_helper.get_session() as session:
+                current = await get_applied_hashes(session)
         except Exception as e:
-            logger.error(f"✗ Error during import: {str(e)}", exc_info=True)
-            raise
+            logger.error(f"Corpus version check failed: {e}")
+            continue
 
+        if applied is not None and current != applied:
+            logger.info("Corpus was updated by another process, invalidating caches")
+            _invalidate_caches(
+                current.get(VOCABULARY) != applied.get(VOCABULARY),
+                current.get(IDIOMS) != applied.get(IDIOMS)
+            )
+        applied = current
 
-if __name__ == "__main__":
-    import asyncio
 
+if __name__ == "__main__":
     asyncio.run(start_import())
\ No newline at end of file
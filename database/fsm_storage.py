@@ -0,0 +1,255 @@
+"""
+Хранилище FSM aiogram в PostgreSQL.
+
+Заменяет MemoryStorage: состояния и данные FSM переживают перезапуск
+и доступны нескольким процессам бота. Одна строка таблицы fsm_storage
+на ключ, данные хранятся в JSON: datetime и словари с не строковыми
+ключами кодируются метками, кортежи (в том числе NamedTuple) становятся
+списками. Другие типы в данные FSM класть нельзя - при записи будет
+TypeError. Нечитаемая запись логируется и считается пустой.
+
+Внутри обновления (см. PostgresStorage.scope и middleware.fsm_middleware)
+чтения кэшируются, а записи копятся и сбрасываются в БД одним пакетом
+в конце обработки: сколько бы раз хендлер ни вызывал get_data /
+update_data, это один SELECT и один INSERT ... ON CONFLICT на ключ.
+Scope считает запросы, реально дошедшие до БД (для профилирования).
+"""
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.db_helper import db_helper
+from model.model import FSMRecord
+
+logger = logging.getLogger(__name__)
+
+# Маркер "значение еще не загружено из БД"
+_MISSING: Any = object()
+
+# Метки нестандартных для JSON значений
+_DATETIME = "__datetime__"
+_DATE = "__date__"
+_ITEMS = "__items__"
+
+
+def to_json(value: Any) -> Any:
+    """Привести данные FSM к JSON-совместимому виду"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return to_json(value.value)
+    if isinstance(value, datetime):
+        return {_DATETIME: value.isoformat()}
+    if isinstance(value, date):
+        return {_DATE: value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: to_json(item) for key, item in value.items()}
+        return {_ITEMS: [[to_json(key), to_json(item)] for key, item in value.items()]}
+    raise TypeError(f"Value of type {type(value).__name__} can't be stored in FSM data")
+
+
+def from_json(value: Any) -> Any:
+    """Обратное преобразование to_json"""
+    if isinstance(value, list):
+        return [from_json(item) for item in value]
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if _DATETIME in value:
+                return datetime.fromisoformat(value[_DATETIME])
+            if _DATE in value:
+                return date.fromisoformat(value[_DATE])
+            if _ITEMS in value:
+                return {from_json(key): from_json(item) for key, item in value[_ITEMS]}
+        return {key: from_json(item) for key, item in value.items()}
+    return value
+
+
+@dataclass
+class _Record:
+    state: str | None = _MISSING
+    data: dict[str, Any] = _MISSING
+    # Измененные поля: 'state' и/или 'data'
+    dirty: set[str] = field(default_factory=set)
+
+
+@dataclass
+class FSMScope:
+    """Единица работы FSM на одно обновление"""
+    records: dict[str, _Record] = field(default_factory=dict)
+    # Запросы к БД за обновление
+    selects: int = 0
+    writes: int = 0
+
+
+class PostgresStorage(BaseStorage):
+    """FSM storage поверх таблицы fsm_storage"""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] | None = None):
+        self._session_factory = session_factory or db_helper.session_factory
+        self._scope: ContextVar[FSMScope | None] = ContextVar("fsm_scope", default=None)
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        return ":".join(str(part) if part is not None else "" for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        ))
+
+    @staticmethod
+    def _dump(data: dict[str, Any]) -> dict[str, Any] | None:
+        return to_json(data) if data else None
+
+    @staticmethod
+    def _load(key: str, raw: Any) -> dict[str, Any]:
+        if not raw:
+            return {}
+        try:
+            data = from_json(raw)
+            if not isinstance(data, dict):
+                raise TypeError(f"expected object, got {type(data).__name__}")
+            return data
+        except (TypeError, ValueError, KeyError) as e:
+            # Запись не должна блокировать пользователя - начинаем с пустых данных
+            logger.error(f"Unreadable FSM data for {key}, resetting: {e}")
+            return {}
+
+    @asynccontextmanager
+    async def scope(self):
+        """
+        Кэшировать чтения и копить записи до конца блока.
+        Накопленные изменения записываются даже если обработчик упал -
+        как и с MemoryStorage, где запись происходит сразу.
+
+        Yields:
+            FSMScope (счетчики запросов окончательны после выхода из блока)
+        """
+        outer = self._scope.get()
+        if outer is not None:
+            # Вложенный scope - работаем в рамках внешнего
+            yield outer
+            return
+
+        scope = FSMScope()
+        token = self._scope.set(scope)
+        try:
+            yield scope
+        finally:
+            self._scope.reset(token)
+            scope.writes += await self._flush(scope.records)
+
+    async def _get_record(self, key: str, need: str) -> _Record:
+        """Запись из scope (или временная), с загруженным полем need"""
+        scope = self._scope.get()
+        record = scope.records.setdefault(key, _Record()) if scope else _Record()
+
+        if getattr(record, need) is _MISSING:
+            async with self._session_factory() as session:
+                result = await session.execute(
+                    select(FSMRecord.state, FSMRecord.data).where(FSMRecord.key == key)
+                )
+                row = result.one_or_none()
+            if scope:
+                scope.selects += 1
+            state, data = (row.state, self._load(key, row.data)) if row else (None, {})
+            # Не затираем поля, уже измененные в этом обновлении
+            if record.state is _MISSING:
+                record.state = state
+            if record.data is _MISSING:
+                record.data = data
+
+        return record
+
+    async def _set_field(self, key: str, name: str, value: Any) -> None:
+        scope = self._scope.get()
+        if scope is None:
+            record = _Record(dirty={name})
+            setattr(record, name, value)
+            await self._flush({key: record})
+            return
+
+        record = scope.records.setdefault(key, _Record())
+        setattr(record, name, value)
+        record.dirty.add(name)
+
+    async def _flush(self, records: Mapping[str, _Record]) -> int:
+        """
+        Записать измененные записи: пустые - удалить, остальные - upsert.
+
+        Returns:
+            Количество выполненных запросов
+        """
+        to_delete = []
+        # Группы по набору измененных полей: один INSERT ... ON CONFLICT на группу
+        to_upsert: dict[frozenset[str], list[dict[str, Any]]] = {}
+
+        for key, record in records.items():
+            if not record.dirty:
+                continue
+            if record.state is None and record.data is not _MISSING and not record.data:
+                to_delete.append(key)
+                continue
+
+            row = {"key": key}
+            if "state" in record.dirty:
+                row["state"] = record.state
+            if "data" in record.dirty:
+                row["data"] = self._dump(record.data)
+            to_upsert.setdefault(frozenset(record.dirty), []).append(row)
+
+        if not to_delete and not to_upsert:
+            return 0
+
+        async with self._session_factory() as session:
+            if to_delete:
+                await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(to_delete)))
+            for fields, rows in to_upsert.items():
+                stmt = insert(FSMRecord).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FSMRecord.key],
+                    set_={
+                        **{name: getattr(stmt.excluded, name) for name in fields},
+                        "updated_at": func.now(),
+                    },
+                )
+                await session.execute(stmt)
+            await session.commit()
+
+        for record in records.values():
+            record.dirty.clear()
+        return len(to_upsert) + bool(to_delete)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._set_field(self._build_key(key), "state", value)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await self._get_record(self._build_key(key), "state")
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._set_field(self._build_key(key), "data", dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = await self._get_record(self._build_key(key), "data")
+        return record.data.copy()
+
+    async def close(self) -> None:
+        # Движок принадлежит db_helper и закрывается вместе с ним
+        pass
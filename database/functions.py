@@ -116,7 +116,6 @@ async def get_all_idioms(session: AsyncSession) -> list[Idiom] | list[Any]:
                     'italian_idiom': idiom.italian_idiom,
                     'rus_idiom': idiom.rus_idiom
                 })
-                logger.info(f'Reading idiom is {idiom.rus_idiom}, {idiom.italian_idiom}')
                 idiom_reads.append(idiom_read)
             except ValidationError as e:
                 logger.error(f"Pydantic error for idiom ID {idiom.id}: {e}")
@@ -134,47 +133,6 @@ async def get_all_idioms(session: AsyncSession) -> list[Idiom] | list[Any]:
 async def get_theme_name_by_id(session: AsyncSession, id: int):
     pass
 
-async def insert_data_from_json(session: AsyncSession, json_file_path: str):
-    """
-    Вставляет данные из подготовленного JSON файла в базу данных
-    """
-    try:
-
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        for theme_name, words in data.items():
-
-            theme = Theme(name=theme_name)
-            session.add(theme)
-            try:
-                await session.flush()  # Flush to get theme.id
-            except IntegrityError:
-
-                await session.rollback()
-                stmt = select(Theme).where(Theme.name == theme_name)
-                result = await session.execute(stmt)
-                logger.info(f"Processing theme: {theme_name}")
-                theme = result.scalar_one()
-
-
-            for word in words:
-                vocabulary = Vocabulary(
-                    italian_word=word['italian'],
-                    rus_word=word['russian'],
-                    theme_id=theme.id
-                )
-                session.add(vocabulary)
-
-
-        await session.commit()
-
-        return {"message": "Data inserted successfully"}
-
-    except Exception as e:
-        await session.rollback()
-        raise Exception(f"Error inserting data: {str(e)}")
-
-
 # Helper function to check if theme exists
 async def get_theme_by_name(session: AsyncSession, theme_name: str) -> Theme:
     """
@@ -185,48 +143,6 @@ async def get_theme_by_name(session: AsyncSession, theme_name: str) -> Theme:
     return result.scalar_one_or_none()
 
 
-async def insert_idioms_from_json(session: AsyncSession, json_file_path: str):
-    """
-    Вставляет данные из подготовленного JSON файла в базу данных
-    """
-    try:
-
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-
-
-        if not isinstance(data, list):
-            raise ValueError("JSON data must be a list of idiom pairs")
-
-
-        for idiom_data in data:
-            idiom_phrase = Idiom(
-                italian_idiom=idiom_data['italian'],
-                rus_idiom=idiom_data['russian']
-            )
-            session.add(idiom_phrase)
-
-        await session.commit()
-        return {"message": "Data inserted successfully"}
-
-    except FileNotFoundError:
-        await session.rollback()
-        raise Exception(f"JSON file not found: {json_file_path}")
-    except json.JSONDecodeError:
-        await session.rollback()
-        raise Exception("Invalid JSON format")
-    except KeyError as e:
-        await session.rollback()
-        raise Exception(f"Missing required field: {str(e)}")
-    except Exception as e:
-        await session.rollback()
-        raise Exception(f"Error inserting data: {str(e)}")
-
-
-# async def main():
-#     async with async_session() as session:
-#         result = await insert_idioms_from_json(session, "italian_idioms.json")
-#         print(result)
 async def main(session: AsyncSession):
     result = await get_all_idioms(session)
     print(result)
@@ -1,19 +1,49 @@
-import os
-from pydantic import BaseModel, Field, PostgresDsn, field_validator
+import re
+from pydantic import BaseModel, Field, PostgresDsn, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Annotated
 
-print("DEBUG: Current environment variables:")
-for key, value in os.environ.items():
-    if 'BOT' in key or 'TOKEN' in key:
-        print(f"DEBUG: {key} = {value}")
-
 class RunConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
 
 
 
+class SchedulerConfig(BaseModel):
+    """Параллельная обработка обновлений (middleware.scheduler_middleware)"""
+    max_concurrent_updates: int = 50
+    # Ожидание в очереди дольше этого (сек) попадает в лог
+    lag_warning: float = 5.0
+
+
+class WebhookConfig(BaseModel):
+    """Режим webhook (вместо long polling), сервер слушает settings.run"""
+    enabled: bool = False
+    # Публичный адрес бота без пути, например https://bot.example.com
+    base_url: str = ""
+    path: str = "/webhook"
+    # Telegram передает его в заголовке X-Telegram-Bot-Api-Secret-Token
+    secret: str = ""
+    # Сколько одновременных HTTPS-соединений открывает Telegram (1-100).
+    # Параллельность обработки задает settings.scheduler
+    max_connections: int = Field(default=40, ge=1, le=100)
+    # Сколько обновлений может ждать обработки; сверх этого Telegram получит 429 и повторит позже
+    max_pending_updates: int = 1000
+
+    @model_validator(mode='after')
+    def validate_enabled(self) -> "WebhookConfig":
+        if self.enabled:
+            if not self.base_url:
+                raise ValueError("WEBHOOK__BASE_URL is required when webhook is enabled")
+            if not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", self.secret):
+                raise ValueError("WEBHOOK__SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ and -")
+        return self
+
+    @property
+    def url(self) -> str:
+        return self.base_url.rstrip("/") + self.path
+
+
 class DatabaseConfig(BaseModel):
     url: PostgresDsn = Field(  # Добавляем валидацию PostgreSQL DSN
         default="postgresql+asyncpg://user:password@pg:5432/learning_language",
@@ -39,6 +69,17 @@ class BotConfig(BaseModel):
 class OpenAIConfig(BaseModel):
     api_key: str = Field(default="", description="OpenAI API Key")
     enabled: bool = Field(default=False, description="Enable OpenAI features")
+    # Общий пул HTTP-соединений и ограничение параллельных запросов
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    max_concurrency: int = 10
+    timeout: float = 60.0
+    max_retries: int = 2
+    # Лимиты провайдера и очередь запросов (см. services/ai_admission.py)
+    rpm_limit: int = 500
+    tpm_limit: int = 30_000
+    max_queue: int = 100
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -51,10 +92,11 @@ class Settings(BaseSettings):
     )
 
     run: RunConfig = Field(default_factory=RunConfig)
+    webhook: WebhookConfig = Field(default_factory=WebhookConfig)
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
     db: DatabaseConfig = Field(default_factory=DatabaseConfig)
     bot: Annotated[BotConfig, Field()]
     openai: OpenAIConfig = Field(default_factory=OpenAIConfig)
 
 
 settings = Settings()
-print(f"✓ Settings loaded: bot_token={settings.bot.token[:10]}...")
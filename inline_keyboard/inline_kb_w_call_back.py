@@ -74,13 +74,11 @@ def generate_quiz_options(words: list, current_word) -> list:
     """
     possible_answers = [current_word.rus_word]
 
-    other_words = [word for word in words if word.rus_word != current_word.rus_word]
-    if len(other_words) >= 3:
-        random_words = random.sample(other_words, 3)
-        possible_answers.extend([word.rus_word for word in random_words])
-    else:
-        while len(possible_answers) < 4:
-            possible_answers.append(random.choice(other_words).rus_word)
+    # Уникальные переводы: если их меньше 3, вариантов будет меньше 4
+    other_translations = list(dict.fromkeys(
+        word.rus_word for word in words if word.rus_word != current_word.rus_word
+    ))
+    possible_answers.extend(random.sample(other_translations, min(3, len(other_translations))))
 
     random.shuffle(possible_answers)
     return possible_answers
@@ -1,15 +1,32 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from db_config.db_config import settings  # ИСПРАВЛЕНО: новый импорт
+from database.fsm_storage import PostgresStorage
+from middleware.fsm_middleware import FSMScopeMiddleware
+from middleware.scheduler_middleware import UpdateSchedulerMiddleware
 
 bot = Bot(
     token=settings.bot.token,  # ИСПРАВЛЕНО: используем settings
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
 
-# все данные бота, которые мы не сохраняем в БД
-# (к примеру состояния), будут стёрты при перезапуске
-dp = Dispatcher(storage=MemoryStorage())
\ No newline at end of file
+# состояния FSM хранятся в PostgreSQL и переживают перезапуск бота;
+# обновления при этом должен обрабатывать один процесс бота -
+# очередность обновлений пользователя держится в памяти (см. scheduler ниже)
+storage = PostgresStorage()
+dp = Dispatcher(storage=storage)
+
+# FSMContextMiddleware диспетчера читает состояние до вызова хендлера,
+# поэтому единица работы FSM должна его оборачивать
+dp.update.outer_middleware.unregister(dp.fsm)
+# обновления одного пользователя - по очереди, разных - параллельно;
+# очередь стоит до FSM, чтобы состояние читалось уже внутри нее
+scheduler = UpdateSchedulerMiddleware(
+    max_concurrent=settings.scheduler.max_concurrent_updates,
+    lag_warning=settings.scheduler.lag_warning
+)
+dp.update.outer_middleware(scheduler)
+dp.update.outer_middleware(FSMScopeMiddleware(storage))
+dp.update.outer_middleware(dp.fsm)
@@ -1,48 +1,120 @@
 import asyncio
 
-from aiogram.filters import Command
-import logging
-from admin.handlers import router
-from loader import bot, dp
-from admin.ai_handlers import router as ai_router
-from admin.start_handlers import start_router
-from admin.quiz_handlers import quiz_router
-from admin.advanced_handlers import router as advanced_router
-from admin.stats_handlers import router as stats_router
-from db_config.db_config import settings
-from config_data.config import logger
-from utils.set_commands import set_commands
-from middleware.middleware import DatabaseMiddleware
-from model.model import Base
-from database.db_main import start_import
-from middleware.user_middleware import UserMiddleware
+# профилировщик запуска импортируется первым, чтобы замерить остальные импорты
+from utils.startup_profile import profiler
 
+with profiler.phase("imports"):
+    from aiogram.filters import Command
+    import logging
+    from admin.handlers import router
+    from loader import bot, dp, scheduler
+    from admin.ai_handlers import router as ai_router
+    from admin.start_handlers import start_router
+    from admin.quiz_handlers import quiz_router
+    from admin.advanced_handlers import router as advanced_router
+    from admin.stats_handlers import router as stats_router
+    from db_config.db_config import settings
+    from config_data.config import logger
+    from utils.set_commands import set_commands
+    from utils.webhook import run_webhook
+    from middleware.middleware import DatabaseMiddleware
+    from model.model import Base
+    from database.db_main import start_import, watch_corpus
+    from middleware.user_middleware import UserMiddleware
+    from middleware.ai_middleware import AIAdmissionMiddleware
+    from services.user_cache import user_cache
+    from services.quiz_pool import quiz_pool
+    from services.theme_cache import theme_cache
+    from database.db_helper import db_helper
+    from services.ai_client import ai_client
+    from services.ai_health import ai_health
+    from services.openai_service import get_openai_service
+    from services.exercise_pool import exercise_pool
+    from services.exercise_service import get_exercise_service
 
 
+async def warm_up(background_tasks: list[asyncio.Task]):
+    """
+    Прогрев тяжелых подсистем уже после начала приема обновлений:
+    синхронизация словаря, кэши, команды меню, клиент OpenAI и AI-задачи.
+    """
+    try:
+        with profiler.phase("corpus sync"):
+            applied = await start_import()
+        # корпус могут обновить другие реплики - тогда кэши сбрасываются
+        background_tasks.append(asyncio.create_task(watch_corpus(applied)))
+        with profiler.phase("caches warm-up"):
+            async with db_helper.get_session() as session:
+                await quiz_pool.ensure_loaded(session)
+                await theme_cache.get_keyboard(session)
+        with profiler.phase("set commands"):
+            await set_commands(bot)
+    except Exception as e:
+        logger.error(f"Startup warm-up failed: {e}", exc_info=True)
+
+    openai_service = get_openai_service()
+    if not openai_service.enabled:
+        return
+
+    with profiler.phase("AI client warm-up"):
+        await ai_client.warm_up()
+
+    # фоновая проверка доступности OpenAI - хендлеры читают готовое состояние
+    background_tasks.append(asyncio.create_task(ai_health.run(openai_service.check_api_key)))
+
+    # фоновое пополнение пула упражнений
+    if get_exercise_service().enabled:
+        background_tasks.append(asyncio.create_task(exercise_pool.run()))
+
+
+async def on_startup():
+    profiler.report()
 
 
 async def main():
     try:
-        logger.info("Checking database and importing data if needed...")
-        await start_import()
-
-        dp.update.middleware(DatabaseMiddleware())
-        dp.update.middleware(UserMiddleware())
-        logger.info('middleware registered')
-        dp.include_router(start_router)
-        dp.include_router(router)
-        dp.include_router(quiz_router)
-        dp.include_router(ai_router)
-        dp.include_router(advanced_router)
-        dp.include_router(stats_router)
-        logger.info('routers included')
-        await set_commands(bot)
-
-        # удаляет все обновления, которые произошли после последнего завершения работы бота
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        with profiler.phase("middleware and routers"):
+            dp.update.middleware(DatabaseMiddleware())
+            dp.update.middleware(UserMiddleware())
+            # очередь и лимиты запросов к AI для хендлеров с флагом ai_request
+            ai_router.message.middleware(AIAdmissionMiddleware())
+            advanced_router.message.middleware(AIAdmissionMiddleware())
+            logger.info('middleware registered')
+            dp.include_router(start_router)
+            dp.include_router(router)
+            dp.include_router(quiz_router)
+            dp.include_router(ai_router)
+            dp.include_router(advanced_router)
+            dp.include_router(stats_router)
+            logger.info('routers included')
+        dp.startup.register(on_startup)
+
+        # фоновая запись изменений пользователей из кэша
+        background_tasks = [asyncio.create_task(user_cache.run_flusher())]
+
+        # метрики очередей обработки обновлений
+        background_tasks.append(asyncio.create_task(scheduler.run_reporter()))
+
+        # словарь, команды меню и AI прогреваются параллельно с приемом обновлений
+        background_tasks.append(asyncio.create_task(warm_up(background_tasks)))
+
+        try:
+            if settings.webhook.enabled:
+                # обновления приходят по HTTP; реплика должна быть одна -
+                # очередность обновлений пользователя держится в процессе
+                await run_webhook(bot, dp)
+            else:
+                # удаляет все обновления, которые произошли после последнего завершения работы бота
+                with profiler.phase("delete webhook"):
+                    await bot.delete_webhook(drop_pending_updates=True)
+                await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        finally:
+            for task in background_tasks:
+                task.cancel()
+            await user_cache.flush()
+            await ai_client.close()
     except Exception as e:
         logger.critical(f"Бот не может быть запущен: {str(e)}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
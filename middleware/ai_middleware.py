@@ -0,0 +1,35 @@
+"""
+Middleware допуска запросов к AI.
+
+Хендлеры, помеченные флагом ai_request (@flags.ai_request), выполняются
+в рамках ai_admission.user_request: сообщение о позиции в очереди
+и понятный ответ при перегрузке. Флаг нужен каждому хендлеру, который
+может обратиться к AI, в том числе через вызов другого хендлера.
+"""
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+
+from services.ai_admission import ai_admission, AIOverloadedError
+
+
+class AIAdmissionMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: dict[str, Any]
+    ) -> Any:
+        if not get_flag(data, "ai_request"):
+            return await handler(event, data)
+
+        async def on_queued(position: int) -> None:
+            await event.answer(f"⏳ Сейчас много запросов к AI. Ваша позиция в очереди: {position}")
+
+        try:
+            async with ai_admission.user_request(on_queued):
+                return await handler(event, data)
+        except AIOverloadedError:
+            await event.answer("😔 AI-сервис сейчас перегружен. Попробуйте через минуту")
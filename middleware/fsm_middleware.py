@@ -0,0 +1,31 @@
+from aiogram import BaseMiddleware
+from typing import Callable, Awaitable, Any
+from aiogram.types import TelegramObject
+from config_data.config import logger
+from database.fsm_storage import PostgresStorage
+
+
+class FSMScopeMiddleware(BaseMiddleware):
+    """
+    Открывает единицу работы FSM на время обработки обновления:
+    чтения состояния кэшируются, записи уходят в БД одним пакетом в конце.
+    Должен стоять перед FSMContextMiddleware диспетчера (см. loader.py).
+    В debug-лог пишет, сколько запросов к БД сделал FSM за обновление.
+    """
+
+    def __init__(self, storage: PostgresStorage):
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        scope = None
+        try:
+            async with self.storage.scope() as scope:
+                return await handler(event, data)
+        finally:
+            if scope is not None:
+                logger.debug(f"FSM DB queries for update: {scope.selects} SELECT, {scope.writes} writes")
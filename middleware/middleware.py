@@ -10,6 +10,8 @@ class DatabaseMiddleware(BaseMiddleware):
         event: Message,
         data: dict[str, Any]
     ) -> Any:
-        async with db_helper.get_session() as session:  # Теперь работает корректно
+        # Сессия ленивая: соединение берется из пула только при первом запросе,
+        # коммит выполняется только если были изменения
+        async with db_helper.get_lazy_session() as session:
             data["session"] = session
-            return await handler(event, data)
\ No newline at end of file
+            return await handler(event, data)
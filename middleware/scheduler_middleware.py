@@ -0,0 +1,135 @@
+"""
+Планировщик обработки обновлений.
+
+Обновления разных пользователей обрабатываются параллельно (не больше
+max_concurrent одновременно), обновления одного пользователя - строго
+по очереди. Так двойное нажатие на ответ в викторине не приводит
+к гонке в update_word_progress и двойному начислению XP.
+
+Outer middleware: регистрируется до FSM, чтобы состояние читалось
+уже внутри очереди пользователя.
+
+Очередь пользователя живет в памяти процесса, поэтому порядок
+гарантируется, только если все обновления обрабатывает один процесс
+бота (polling или одна webhook-реплика). При нескольких репликах два
+быстрых обновления одного пользователя могут попасть в разные процессы
+и обрабатываться одновременно; данные FSM записываются целиком, так что
+одна из записей потеряется (например, прибавка correct_count в квизе).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _UserQueue:
+    lock: asyncio.Lock
+    # Обновления пользователя в работе или в ожидании
+    pending: int = 0
+
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """Параллельно для разных пользователей, последовательно для одного"""
+
+    def __init__(self, max_concurrent: int = 50, lag_warning: float = 5.0):
+        self.max_concurrent = max_concurrent
+        self.lag_warning = lag_warning
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._queues: dict[int, _UserQueue] = {}
+        # Метрики
+        self.queued = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.max_user_depth = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    @staticmethod
+    def _queue_key(data: dict[str, Any]) -> int | None:
+        user = data.get("event_from_user")
+        if user is not None:
+            return user.id
+        chat = data.get("event_chat")
+        return chat.id if chat is not None else None
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        received = time.monotonic()
+        key = self._queue_key(data)
+
+        queue = None
+        if key is not None:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = _UserQueue(asyncio.Lock())
+            queue.pending += 1
+            self.max_user_depth = max(self.max_user_depth, queue.pending)
+
+        started = False
+        self.queued += 1
+        try:
+            if queue is not None:
+                await queue.lock.acquire()
+            try:
+                async with self._semaphore:
+                    started = True
+                    self.queued -= 1
+                    self._record_lag(event, time.monotonic() - received)
+                    self.in_flight += 1
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.in_flight -= 1
+                        self.processed += 1
+            finally:
+                if queue is not None:
+                    queue.lock.release()
+        finally:
+            if not started:
+                # Отменено во время ожидания
+                self.queued -= 1
+            if queue is not None:
+                queue.pending -= 1
+                if queue.pending == 0:
+                    del self._queues[key]
+
+    def _record_lag(self, event: TelegramObject, lag: float) -> None:
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.lag_warning:
+            update_id = event.update_id if isinstance(event, Update) else None
+            logger.warning(f"Update {update_id} waited {lag:.2f}s in scheduler queue")
+
+    def stats(self) -> dict:
+        """Глубина очередей и задержка начала обработки"""
+        started = self.processed + self.in_flight
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "users": len(self._queues),
+            "deepest_user_queue": max((queue.pending for queue in self._queues.values()), default=0),
+            "max_user_depth": self.max_user_depth,
+            "processed": self.processed,
+            "avg_lag": round(self.total_lag / started, 3) if started else 0.0,
+            "max_lag": round(self.max_lag, 3),
+        }
+
+    async def run_reporter(self, interval: float = 60.0) -> None:
+        """Фоновая задача: периодически писать метрики в лог, если были обновления"""
+        last_processed = -1
+        while True:
+            await asyncio.sleep(interval)
+            if self.processed != last_processed:
+                last_processed = self.processed
+                logger.info(f"Update scheduler: {self.stats()}")
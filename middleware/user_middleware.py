@@ -5,6 +5,7 @@ from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, User as TelegramUser, Message, CallbackQuery, TelegramObject
 from services.user_service import UserService
+from services.user_cache import user_cache
 from config_data.config import logger
 
 
@@ -13,6 +14,7 @@ class UserMiddleware(BaseMiddleware):
     """
     Middleware для автоматической регистрации пользователей в БД.
     Запускается при каждом обращении к боту.
+    Пользователи кэшируются в памяти (services.user_cache).
     """
 
     async def __call__(
@@ -34,24 +36,41 @@ class UserMiddleware(BaseMiddleware):
             telegram_user = data.get("event_from_user")
 
         if telegram_user and not telegram_user.is_bot:
-            session = data.get("session")
-
-            if session:
-                try:
-                    # Автоматически создаём/обновляем пользователя
-                    db_user = await UserService.get_or_create_user(
-                        session=session,
-                        telegram_id=telegram_user.id,
-                        username=telegram_user.username,
-                        first_name=telegram_user.first_name,
-                        last_name=telegram_user.last_name
-                    )
-
-                    # Добавляем user в data для использования в handlers
-                    data["db_user"] = db_user
-
-                except Exception as e:
-                    logger.error(f"Error in UserMiddleware: {e}")
+            db_user = user_cache.get(telegram_user.id)
+
+            if db_user is not None:
+                # Пользователь в кэше - изменения профиля и streak
+                # запишутся в БД в фоне, запросов к БД нет
+                changes = UserService.get_activity_changes(
+                    db_user,
+                    username=telegram_user.username,
+                    first_name=telegram_user.first_name,
+                    last_name=telegram_user.last_name
+                )
+                if changes:
+                    user_cache.apply_changes(db_user, changes)
+
+                data["db_user"] = db_user
+            else:
+                session = data.get("session")
+
+                if session:
+                    try:
+                        # Автоматически создаём/обновляем пользователя
+                        db_user = await UserService.get_or_create_user(
+                            session=session,
+                            telegram_id=telegram_user.id,
+                            username=telegram_user.username,
+                            first_name=telegram_user.first_name,
+                            last_name=telegram_user.last_name
+                        )
+                        user_cache.put(db_user)
+
+                        # Добавляем user в data для использования в handlers
+                        data["db_user"] = db_user
+
+                    except Exception as e:
+                        logger.error(f"Error in UserMiddleware: {e}")
 
         # Продолжаем обработку события
         return await handler(event, data)
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""add exercise pool
+
+Revision ID: 2c6f9a1d8e43
+Revises: 9d4a7c3e6b12
+Create Date: 2026-10-18 14:02:53.730915
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2c6f9a1d8e43"
+down_revision: Union[str, None] = "9d4a7c3e6b12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "exercise_pool",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("exercise_type", sa.String(length=20), nullable=False),
+        sa.Column("topic", sa.String(length=100), nullable=False),
+        sa.Column("level", sa.String(length=20), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_exercise_pool_key",
+        "exercise_pool",
+        ["exercise_type", "topic", "level", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_exercise_pool_key", table_name="exercise_pool")
+    op.drop_table("exercise_pool")
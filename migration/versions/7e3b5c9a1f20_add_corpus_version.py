@@ -0,0 +1,40 @@
+"""add corpus version
+
+Revision ID: 7e3b5c9a1f20
+Revises: 2c6f9a1d8e43
+Create Date: 2026-10-18 15:21:07.418302
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e3b5c9a1f20"
+down_revision: Union[str, None] = "2c6f9a1d8e43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "corpus_version",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("section_hashes", sa.JSON(), nullable=False),
+        sa.Column("entries", sa.Integer(), nullable=False),
+        sa.Column(
+            "applied_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("corpus_version")
@@ -0,0 +1,61 @@
+"""add ai response cache
+
+Revision ID: 9d4a7c3e6b12
+Revises: 5b8e1f0c2a71
+Create Date: 2026-10-18 13:21:07.184420
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4a7c3e6b12"
+down_revision: Union[str, None] = "5b8e1f0c2a71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_response_cache",
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("kind", sa.String(length=50), nullable=False),
+        sa.Column("word", sa.String(length=255), nullable=False),
+        sa.Column("model", sa.String(length=50), nullable=False),
+        sa.Column("prompt_version", sa.Integer(), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("cache_key"),
+    )
+    op.create_index(
+        op.f("ix_ai_response_cache_created_at"),
+        "ai_response_cache",
+        ["created_at"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_ai_response_cache_expires_at"),
+        "ai_response_cache",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_ai_response_cache_expires_at"), table_name="ai_response_cache"
+    )
+    op.drop_index(
+        op.f("ix_ai_response_cache_created_at"), table_name="ai_response_cache"
+    )
+    op.drop_table("ai_response_cache")
@@ -0,0 +1,44 @@
+"""add review due index
+
+Revision ID: a4f8d2e6c913
+Revises: 7e3b5c9a1f20
+Create Date: 2026-10-18 16:04:39.512876
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4f8d2e6c913"
+down_revision: Union[str, None] = "7e3b5c9a1f20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_user_word_progress_due",
+        "user_word_progress",
+        ["user_id", "next_review_date"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('new', 'learning', 'learned')"),
+    )
+    # Слова, на которые уже отвечали до появления расписания SM-2, -
+    # сразу в очередь повторения
+    op.execute(
+        "UPDATE user_word_progress "
+        "SET next_review_date = COALESCE(last_reviewed_at, first_seen_at, now()) "
+        "WHERE next_review_date IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_user_word_progress_due",
+        table_name="user_word_progress",
+        postgresql_where=sa.text("status IN ('new', 'learning', 'learned')"),
+    )
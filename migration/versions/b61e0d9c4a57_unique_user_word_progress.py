@@ -0,0 +1,107 @@
+"""unique user word progress
+
+Revision ID: b61e0d9c4a57
+Revises: a4f8d2e6c913
+Create Date: 2026-10-18 18:21:07.194532
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b61e0d9c4a57"
+down_revision: Union[str, None] = "a4f8d2e6c913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Дубликаты (user_id, word_id) сливаются в строку с минимальным id:
+    # счетчики суммируются, статус - наибольший из дубликатов
+    op.execute(
+        """
+        WITH merged AS (
+            SELECT
+                user_id,
+                word_id,
+                MIN(id) AS keep_id,
+                SUM(COALESCE(correct_count, 0)) AS correct_count,
+                SUM(COALESCE(wrong_count, 0)) AS wrong_count,
+                MAX(COALESCE(repetitions, 0)) AS repetitions,
+                MAX(COALESCE(interval_days, 0)) AS interval_days,
+                MIN(next_review_date) AS next_review_date,
+                MIN(first_seen_at) AS first_seen_at,
+                MAX(last_reviewed_at) AS last_reviewed_at,
+                MAX(CASE status
+                    WHEN 'mastered' THEN 3
+                    WHEN 'learned' THEN 2
+                    WHEN 'learning' THEN 1
+                    ELSE 0
+                END) AS status_rank
+            FROM user_word_progress
+            GROUP BY user_id, word_id
+            HAVING COUNT(*) > 1
+        )
+        UPDATE user_word_progress AS p
+        SET correct_count = merged.correct_count,
+            wrong_count = merged.wrong_count,
+            repetitions = merged.repetitions,
+            interval_days = merged.interval_days,
+            next_review_date = merged.next_review_date,
+            first_seen_at = merged.first_seen_at,
+            last_reviewed_at = merged.last_reviewed_at,
+            status = (ARRAY['new', 'learning', 'learned', 'mastered'])[merged.status_rank + 1]
+        FROM merged
+        WHERE p.id = merged.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM user_word_progress AS p
+        USING user_word_progress AS kept
+        WHERE p.user_id = kept.user_id
+          AND p.word_id = kept.word_id
+          AND p.id > kept.id
+        """
+    )
+    # Дубликаты могли засчитать слово в total_words_learned дважды
+    op.execute(
+        """
+        UPDATE users AS u
+        SET total_words_learned = (
+            SELECT COUNT(*)
+            FROM user_word_progress AS p
+            WHERE p.user_id = u.id
+              AND p.status IN ('learned', 'mastered')
+        )
+        """
+    )
+
+    op.create_index(
+        "uq_user_word_progress_user_word",
+        "user_word_progress",
+        ["user_id", "word_id"],
+        unique=True,
+    )
+    # Покрывается уникальным индексом (user_id - его первая колонка)
+    op.drop_index(
+        op.f("ix_user_word_progress_user_id"),
+        table_name="user_word_progress",
+    )
+
+
+def downgrade() -> None:
+    op.create_index(
+        op.f("ix_user_word_progress_user_id"),
+        "user_word_progress",
+        ["user_id"],
+        unique=False,
+    )
+    op.drop_index(
+        "uq_user_word_progress_user_word",
+        table_name="user_word_progress",
+    )
@@ -0,0 +1,31 @@
+"""fsm storage json
+
+Revision ID: c3a7e5f18d20
+Revises: b61e0d9c4a57
+Create Date: 2026-10-18 19:42:15.308164
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3a7e5f18d20"
+down_revision: Union[str, None] = "b61e0d9c4a57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Данные в pickle средствами SQL не перевести - они сбрасываются,
+    # состояние (state) сохраняется
+    op.drop_column("fsm_storage", "data")
+    op.add_column("fsm_storage", sa.Column("data", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("fsm_storage", "data")
+    op.add_column("fsm_storage", sa.Column("data", sa.LargeBinary(), nullable=True))
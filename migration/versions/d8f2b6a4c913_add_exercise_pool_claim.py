@@ -0,0 +1,33 @@
+"""add exercise pool claim
+
+Revision ID: d8f2b6a4c913
+Revises: c3a7e5f18d20
+Create Date: 2026-10-18 20:16:41.527903
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d8f2b6a4c913"
+down_revision: Union[str, None] = "c3a7e5f18d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "exercise_pool_claim",
+        sa.Column("pool_key", sa.String(length=150), nullable=False),
+        sa.Column("owner", sa.String(length=32), nullable=False),
+        sa.Column("claimed_until", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("pool_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("exercise_pool_claim")
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean, Float, func
+from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Float, JSON, Index, func, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Mapped, mapped_column, relationship
 from datetime import datetime, timezone
@@ -96,7 +96,8 @@ class UserWordProgress(Base):
     __tablename__ = 'user_word_progress'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), index=True)
+    # Отдельный индекс по user_id не нужен - его покрывает uq_user_word_progress_user_word
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'))
     word_id: Mapped[int] = mapped_column(Integer, ForeignKey('vocabulary.id', ondelete='CASCADE'), index=True)
 
     # Статус изучения
@@ -120,9 +121,17 @@ class UserWordProgress(Base):
     user = relationship("User", back_populates="word_progress")
     word = relationship("Vocabulary", back_populates="user_progress")
 
-    # Уникальность: один пользователь - одно слово
     __table_args__ = (
-        {'schema': None},
+        # Одна строка на пару пользователь-слово: на нем держится
+        # INSERT ... ON CONFLICT в UserService.update_word_progress
+        Index('uq_user_word_progress_user_word', 'user_id', 'word_id', unique=True),
+        # Очередь повторения (UserService.get_words_for_review):
+        # условие должно совпадать с services.srs.REVIEW_STATUSES
+        Index(
+            'ix_user_word_progress_due',
+            'user_id', 'next_review_date',
+            postgresql_where=text("status IN ('new', 'learning', 'learned')")
+        ),
     )
 
     @property
@@ -183,3 +192,96 @@ class Idiom(Base):
         return f"<Idiom(italian={self.italian_idiom[:30]}...)>"
 
 
+class FSMRecord(Base):
+    """
+    Состояние FSM aiogram (database.fsm_storage.PostgresStorage).
+    Данные состояния хранятся в JSON (см. fsm_storage.to_json).
+    """
+    __tablename__ = 'fsm_storage'
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str | None] = mapped_column(String(255))
+    data: Mapped[dict | None] = mapped_column(JSON)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), default=now_utc)
+
+    def __repr__(self):
+        return f"<FSMRecord(key={self.key}, state={self.state})>"
+
+
+class AIResponseCache(Base):
+    """
+    Кэш ответов OpenAI (services.ai_cache).
+    Ключ - хэш от типа запроса, нормализованного слова, модели и версии промпта.
+    """
+    __tablename__ = 'ai_response_cache'
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50))  # explain, example
+    word: Mapped[str] = mapped_column(String(255))
+    model: Mapped[str] = mapped_column(String(50))
+    prompt_version: Mapped[int] = mapped_column(Integer)
+    response: Mapped[str] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), default=now_utc, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+    def __repr__(self):
+        return f"<AIResponseCache(kind={self.kind}, word={self.word}, model={self.model})>"
+
+
+class ExercisePoolItem(Base):
+    """
+    Заранее сгенерированное AI-упражнение (services.exercise_pool).
+    Хендлеры забирают упражнения из пула, фоновая задача его пополняет.
+    """
+    __tablename__ = 'exercise_pool'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    exercise_type: Mapped[str] = mapped_column(String(20))  # gap_fill, quiz
+    topic: Mapped[str] = mapped_column(String(100))
+    level: Mapped[str] = mapped_column(String(20))
+    payload: Mapped[dict] = mapped_column(JSON)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), default=now_utc)
+
+    __table_args__ = (
+        Index('ix_exercise_pool_key', 'exercise_type', 'topic', 'level', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<ExercisePoolItem(type={self.exercise_type}, topic={self.topic}, level={self.level})>"
+
+
+class ExercisePoolClaim(Base):
+    """
+    Кто сейчас пополняет пул упражнений (services.exercise_pool).
+    Захват действует до claimed_until - упавший процесс не блокирует пул навсегда.
+    """
+    __tablename__ = 'exercise_pool_claim'
+
+    pool_key: Mapped[str] = mapped_column(String(150), primary_key=True)  # тип|тема|уровень
+    owner: Mapped[str] = mapped_column(String(32))
+    claimed_until: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<ExercisePoolClaim(pool_key={self.pool_key}, owner={self.owner})>"
+
+
+class CorpusVersion(Base):
+    """
+    Примененная версия файла корпуса (database.corpus_sync).
+    Хэш всего файла и хэши разделов (тем) - чтобы при старте
+    синхронизировать только изменившееся.
+    """
+    __tablename__ = 'corpus_version'
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)  # vocabulary, idioms
+    content_hash: Mapped[str] = mapped_column(String(64))
+    section_hashes: Mapped[dict] = mapped_column(JSON, default=dict)
+    entries: Mapped[int] = mapped_column(Integer, default=0)
+
+    applied_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), default=now_utc)
+
+    def __repr__(self):
+        return f"<CorpusVersion(name={self.name}, hash={self.content_hash[:8]})>"
@@ -0,0 +1,194 @@
+"""
+Контроль допуска запросов к OpenAI.
+
+Все запросы проходят через общую очередь (FIFO):
+- не больше max_concurrency запросов одновременно;
+- token bucket по лимитам провайдера: запросы в минуту (RPM)
+  и токены в минуту (TPM);
+- если запросу приходится ждать, пользователю сообщается позиция в очереди.
+
+При нагрузке запросы ждут своей очереди, а не падают с ошибкой
+от провайдера. Отказ - только если очередь длиннее max_queue.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+
+from db_config.db_config import settings
+
+logger = logging.getLogger(__name__)
+
+QueueCallback = Callable[[int], Awaitable[None]]
+
+# Колбэк "запрос встал в очередь" для текущего запроса пользователя
+_on_queued: ContextVar[QueueCallback | None] = ContextVar("ai_on_queued", default=None)
+
+
+class AIAdmissionError(Exception):
+    """Запрос к AI не допущен"""
+
+
+class AIOverloadedError(AIAdmissionError):
+    """Очередь запросов к AI переполнена"""
+
+
+class TokenBucket:
+    """Token bucket с пополнением rate_per_minute в минуту"""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Сколько секунд ждать, пока в ведре наберется amount"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float) -> None:
+        while (delay := self.wait_time(amount)) > 0:
+            await asyncio.sleep(delay)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Доплатить (amount > 0) или вернуть (amount < 0) токены после запроса"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain(self) -> None:
+        """Опустошить ведро (провайдер ответил 429)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class AIAdmissionController:
+    """Очередь и лимиты запросов к OpenAI"""
+
+    def __init__(self, max_concurrency: int, rpm: int, tpm: int, max_queue: int = 100):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # asyncio.Lock пропускает ожидающих в порядке очереди
+        self._order = asyncio.Lock()
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self.queued = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.admitted = 0
+
+    def _must_wait(self, estimated_tokens: int) -> bool:
+        return (
+            self._order.locked()
+            or self._semaphore.locked()
+            or self._requests.wait_time(1) > 0
+            or self._tokens.wait_time(estimated_tokens) > 0
+        )
+
+    @asynccontextmanager
+    async def user_request(self, on_queued: QueueCallback | None = None):
+        """
+        Запрос пользователя к AI. Одновременных запросов одного
+        пользователя не бывает: его обновления и так обрабатываются
+        по очереди (middleware.scheduler_middleware).
+
+        Args:
+            on_queued: Вызывается с позицией в очереди, если запросу к API
+                придется ждать
+
+        Raises:
+            AIOverloadedError: очередь переполнена
+        """
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise AIOverloadedError(self.queued)
+
+        token = _on_queued.set(on_queued)
+        try:
+            yield
+        finally:
+            _on_queued.reset(token)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        """
+        Слот на один запрос к API: ждет своей очереди, свободного
+        места по параллельности и лимитов RPM/TPM.
+
+        Args:
+            estimated_tokens: Оценка токенов запроса (промпт + max_tokens)
+        """
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            if self._must_wait(estimated_tokens):
+                await self._notify_queued(self.queued)
+
+            async with self._order:
+                await self._semaphore.acquire()
+                try:
+                    await self._requests.acquire(1)
+                    await self._tokens.acquire(estimated_tokens)
+                except BaseException:
+                    self._semaphore.release()
+                    raise
+        finally:
+            self.queued -= 1
+
+        self.admitted += 1
+        self.total_wait += time.monotonic() - started
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    @staticmethod
+    async def _notify_queued(position: int) -> None:
+        callback = _on_queued.get()
+        if callback is None:
+            return
+        try:
+            await callback(position)
+        except Exception as e:
+            logger.warning(f"Failed to notify about AI queue position: {e}")
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Поправить TPM-ведро на разницу между оценкой и фактом"""
+        self._tokens.adjust(actual_tokens - estimated_tokens)
+
+    def record_rate_limited(self) -> None:
+        """Провайдер вернул 429 - притормозить новые запросы"""
+        logger.warning("OpenAI rate limit hit, throttling AI requests")
+        self._requests.drain()
+        self._tokens.drain()
+
+    def stats(self) -> dict:
+        """Статистика очереди"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+        }
+
+
+ai_admission = AIAdmissionController(
+    max_concurrency=settings.openai.max_concurrency,
+    rpm=settings.openai.rpm_limit,
+    tpm=settings.openai.tpm_limit,
+    max_queue=settings.openai.max_queue,
+)
@@ -0,0 +1,157 @@
+"""
+Кэш ответов OpenAI.
+
+Двухуровневый: LRU в памяти процесса поверх таблицы ai_response_cache
+в PostgreSQL (общей для всех процессов бота). Ключ - тип запроса,
+нормализованное слово, модель и версия промпта: при изменении промпта
+достаточно поднять его версию, и старые ответы перестанут использоваться.
+Записи живут ttl, таблица ограничена max_rows (вытесняются самые старые).
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.db_helper import db_helper
+from model.model import AIResponseCache
+from utils.datetime_utils import now_utc
+
+logger = logging.getLogger(__name__)
+
+
+class AIResponseCacheService:
+    """Кэш ответов AI: память (LRU) + PostgreSQL"""
+
+    def __init__(
+        self,
+        memory_size: int = 1000,
+        ttl: timedelta = timedelta(days=30),
+        max_rows: int = 50_000,
+        evict_every: int = 100
+    ):
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.evict_every = evict_every
+        self._memory: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(word: str) -> str:
+        """Нормализовать слово: регистр и лишние пробелы не влияют на ключ"""
+        return " ".join(word.lower().split())
+
+    @staticmethod
+    def make_key(kind: str, word: str, model: str, prompt_version: int) -> str:
+        raw = f"{kind}|{model}|{prompt_version}|{AIResponseCacheService.normalize(word)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _remember(self, key: str, response: str, expires_at: datetime) -> None:
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, kind: str, word: str, model: str, prompt_version: int) -> str | None:
+        """Получить ответ из кэша или None"""
+        key = self.make_key(kind, word, model, prompt_version)
+        now = now_utc()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            response, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return response
+            del self._memory[key]
+
+        try:
+            async with db_helper.get_session() as session:
+                result = await session.execute(
+                    select(AIResponseCache.response, AIResponseCache.expires_at).where(
+                        AIResponseCache.cache_key == key,
+                        AIResponseCache.expires_at > now
+                    )
+                )
+                row = result.one_or_none()
+        except Exception as e:
+            logger.warning(f"AI cache read failed: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self._remember(key, row.response, row.expires_at)
+        self.hits += 1
+        return row.response
+
+    async def set(self, kind: str, word: str, model: str, prompt_version: int, response: str) -> None:
+        """Сохранить ответ в кэш"""
+        key = self.make_key(kind, word, model, prompt_version)
+        expires_at = now_utc() + self.ttl
+        self._remember(key, response, expires_at)
+
+        values = {
+            "cache_key": key,
+            "kind": kind,
+            "word": self.normalize(word)[:255],
+            "model": model,
+            "prompt_version": prompt_version,
+            "response": response,
+            "expires_at": expires_at,
+        }
+        stmt = insert(AIResponseCache).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AIResponseCache.cache_key],
+            set_={"response": stmt.excluded.response, "expires_at": stmt.excluded.expires_at},
+        )
+
+        try:
+            async with db_helper.get_session() as session:
+                await session.execute(stmt)
+        except Exception as e:
+            logger.warning(f"AI cache write failed: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            await self.evict()
+
+    async def evict(self) -> None:
+        """Удалить просроченные записи и записи сверх max_rows (самые старые)"""
+        overflow = (
+            select(AIResponseCache.cache_key)
+            .order_by(AIResponseCache.created_at.desc())
+            .offset(self.max_rows)
+        )
+        try:
+            async with db_helper.get_session() as session:
+                expired = await session.execute(
+                    delete(AIResponseCache).where(AIResponseCache.expires_at <= now_utc())
+                )
+                trimmed = await session.execute(
+                    delete(AIResponseCache).where(AIResponseCache.cache_key.in_(overflow))
+                )
+            logger.info(f"AI cache evicted: {expired.rowcount} expired, {trimmed.rowcount} over limit")
+        except Exception as e:
+            logger.warning(f"AI cache eviction failed: {e}")
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        total = self.hits + self.misses
+        return {
+            "memory_size": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+        }
+
+
+ai_cache = AIResponseCacheService()
@@ -0,0 +1,196 @@
+"""
+Общий клиент OpenAI для всех AI-сервисов.
+
+Один AsyncOpenAI с одним пулом HTTP-соединений (keepalive, лимиты
+соединений). Каждый запрос проходит через ai_admission (параллельность,
+лимиты RPM/TPM, очередь).
+Запросы считаются по фичам (explain, conversation, exercise, ...):
+количество, ошибки, задержка, токены.
+"""
+import asyncio
+import importlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+from db_config.db_config import settings
+from services.ai_admission import ai_admission
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FeatureStats:
+    """Счетчики запросов одной фичи"""
+    requests: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def as_dict(self) -> dict:
+        completed = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency": round(self.total_latency / completed, 3) if completed else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    from openai import RateLimitError
+    return isinstance(error, RateLimitError)
+
+
+class AIClient:
+    """Общий AsyncOpenAI с пулом соединений"""
+
+    def __init__(self):
+        config = settings.openai
+        self.api_key = config.api_key
+        self.enabled = config.enabled and bool(self.api_key)
+        self._client: "AsyncOpenAI | None" = None
+        self._stats: dict[str, FeatureStats] = {}
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """
+        Клиент создается при первом обращении.
+        Пакет openai импортируется здесь же - он тяжелый и не нужен для запуска бота.
+        """
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            config = settings.openai
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=config.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(config.timeout, connect=10.0),
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=http_client,
+                max_retries=config.max_retries,
+            )
+            logger.info(
+                f"OpenAI client initialized: max_connections={config.max_connections}, "
+                f"max_keepalive_connections={config.max_keepalive_connections}"
+            )
+        return self._client
+
+    def _feature(self, feature: str) -> FeatureStats:
+        return self._stats.setdefault(feature, FeatureStats())
+
+    @staticmethod
+    def _estimate_tokens(kwargs: dict) -> int:
+        """Грубая оценка токенов запроса: ~4 символа на токен + max_tokens"""
+        prompt_chars = sum(len(m.get("content") or "") for m in kwargs.get("messages", []))
+        return prompt_chars // 4 + kwargs.get("max_tokens", 0)
+
+    @staticmethod
+    def _record_usage(stats: FeatureStats, usage: Any, estimated_tokens: int) -> None:
+        if usage is not None:
+            stats.prompt_tokens += usage.prompt_tokens or 0
+            stats.completion_tokens += usage.completion_tokens or 0
+            ai_admission.record_usage(estimated_tokens, usage.total_tokens or 0)
+
+    async def chat(self, feature: str, **kwargs) -> Any:
+        """
+        chat.completions.create через общий пул и очередь допуска.
+
+        Args:
+            feature: Имя фичи для статистики
+            **kwargs: Параметры chat.completions.create
+
+        Returns:
+            ChatCompletion
+        """
+        stats = self._feature(feature)
+        stats.requests += 1
+        estimated_tokens = self._estimate_tokens(kwargs)
+
+        async with ai_admission.slot(estimated_tokens):
+            started = time.monotonic()
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                stats.errors += 1
+                if _is_rate_limit(e):
+                    ai_admission.record_rate_limited()
+                raise
+            stats.total_latency += time.monotonic() - started
+
+        self._record_usage(stats, response.usage, estimated_tokens)
+        return response
+
+    async def chat_stream(self, feature: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Потоковый chat.completions.create через общий пул и очередь допуска.
+        Слот занят, пока читается поток.
+
+        Yields:
+            Очередные фрагменты текста ответа
+        """
+        stats = self._feature(feature)
+        stats.requests += 1
+        estimated_tokens = self._estimate_tokens(kwargs)
+
+        async with ai_admission.slot(estimated_tokens):
+            started = time.monotonic()
+            try:
+                stream = await self.client.chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+                async for chunk in stream:
+                    # Последний фрагмент содержит только usage
+                    self._record_usage(stats, chunk.usage, estimated_tokens)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            except Exception as e:
+                stats.errors += 1
+                if _is_rate_limit(e):
+                    ai_admission.record_rate_limited()
+                raise
+            stats.total_latency += time.monotonic() - started
+
+    async def warm_up(self) -> None:
+        """Импортировать openai в отдельном потоке и создать клиент (фоновый прогрев)"""
+        if not self.enabled:
+            return
+        await asyncio.to_thread(importlib.import_module, "openai")
+        self.client
+
+    async def models_retrieve(self, model: str) -> Any:
+        """Информация о модели (проверка ключа без генерации токенов)"""
+        return await self.client.models.retrieve(model)
+
+    def stats(self) -> dict:
+        """Статистика по фичам и очереди запросов"""
+        return {
+            "admission": ai_admission.stats(),
+            "features": {name: stats.as_dict() for name, stats in self._stats.items()},
+        }
+
+    async def close(self) -> None:
+        """Закрыть пул соединений"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+ai_client = AIClient()
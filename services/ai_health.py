@@ -0,0 +1,115 @@
+"""
+Мониторинг доступности OpenAI.
+
+Доступность проверяется фоновой задачей раз в interval секунд
+и дополнительно отслеживается пассивно по результатам реальных запросов.
+Хендлеры читают готовое состояние и не ждут проверочных запросов.
+
+Недоступным сервис считается после failure_threshold ошибок подряд
+(проверок или запросов). После ошибки проверка повторяется раньше
+обычного - через RETRY_DELAYS, так что единичный таймаут не выключает
+AI надолго: пока сервис недоступен, реальных запросов, которые могли бы
+его "вернуть", нет. Ответ 429 (RateLimitError) - это нехватка квоты,
+а не недоступность, и ошибкой не считается.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from utils.datetime_utils import now_utc
+
+logger = logging.getLogger(__name__)
+
+# Задержки перед повторной проверкой после 1-й, 2-й, 3-й и следующих ошибок подряд
+RETRY_DELAYS = (15.0, 30.0, 60.0)
+
+
+def _is_rate_limit(error: Exception | str) -> bool:
+    try:
+        from openai import RateLimitError
+    except ImportError:
+        return False
+    return isinstance(error, RateLimitError)
+
+
+class AIHealthMonitor:
+    """Кэшированное состояние доступности AI-сервиса"""
+
+    def __init__(self, interval: float = 300.0, failure_threshold: int = 3):
+        self.interval = interval
+        # Сколько неудачных запросов подряд нужно, чтобы считать сервис недоступным
+        self.failure_threshold = failure_threshold
+        # None - еще не проверяли (считаем доступным)
+        self.available: bool | None = None
+        self.last_checked_at: datetime | None = None
+        self.last_success_at: datetime | None = None
+        self.last_failure_at: datetime | None = None
+        self.last_error: str | None = None
+        self.consecutive_failures = 0
+
+    @property
+    def is_available(self) -> bool:
+        return self.available is not False
+
+    def record_success(self) -> None:
+        """Успешный запрос к API"""
+        now = now_utc()
+        self.last_checked_at = now
+        self.last_success_at = now
+        self.consecutive_failures = 0
+        if self.available is not True:
+            logger.info("OpenAI is available")
+        self.available = True
+
+    def record_failure(self, error: Exception | str) -> None:
+        """
+        Неудачный запрос или проверка API.
+        Сервис помечается недоступным после failure_threshold ошибок подряд.
+        """
+        if _is_rate_limit(error):
+            return
+        now = now_utc()
+        self.last_checked_at = now
+        self.last_failure_at = now
+        self.last_error = str(error)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.available is not False:
+                logger.warning(f"OpenAI marked unavailable: {error}")
+            self.available = False
+
+    async def run(self, probe: Callable[[], Awaitable[bool]]) -> None:
+        """
+        Фоновая задача периодической проверки.
+
+        Args:
+            probe: Проверка доступности; сама сообщает результат
+                через record_success / record_failure
+        """
+        while True:
+            try:
+                await probe()
+            except Exception as e:
+                self.record_failure(e)
+            await asyncio.sleep(self.next_delay())
+
+    def next_delay(self) -> float:
+        """Через сколько секунд проверять снова"""
+        if self.consecutive_failures == 0:
+            return self.interval
+        retry = RETRY_DELAYS[min(self.consecutive_failures, len(RETRY_DELAYS)) - 1]
+        return min(retry, self.interval)
+
+    def status(self) -> dict:
+        """Состояние для отображения пользователю"""
+        return {
+            "available": self.is_available,
+            "last_checked_at": self.last_checked_at,
+            "last_success_at": self.last_success_at,
+            "last_failure_at": self.last_failure_at,
+            "last_error": self.last_error,
+        }
+
+
+ai_health = AIHealthMonitor()
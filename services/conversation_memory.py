@@ -0,0 +1,82 @@
+"""
+Ограниченная память диалога.
+
+В FSM хранится не вся история, а последние реплики (не больше max_turns)
+и краткое содержание более ранней части диалога. Когда реплик становится
+больше max_turns, старые (кроме keep_recent последних) сворачиваются
+в summary отдельным запросом к модели.
+
+При сборке промпта реплики берутся с конца, пока укладываются
+в token_budget (оценка ~4 символа на токен).
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+# Ключи в данных FSM
+HISTORY_KEY = "conversation_history"
+SUMMARY_KEY = "conversation_summary"
+
+# Максимальная длина одной сохраняемой реплики, символов
+MAX_TURN_CHARS = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов: ~4 символа на токен + служебные токены сообщения"""
+    return len(text) // 4 + 4
+
+
+@dataclass
+class ConversationMemory:
+    """Последние реплики диалога и краткое содержание предыдущих"""
+    turns: list[dict[str, str]] = field(default_factory=list)
+    summary: str = ""
+    max_turns: int = 12
+    keep_recent: int = 6
+    token_budget: int = 1200
+
+    @classmethod
+    def from_state(cls, data: dict[str, Any]) -> "ConversationMemory":
+        return cls(
+            turns=list(data.get(HISTORY_KEY, [])),
+            summary=data.get(SUMMARY_KEY, ""),
+        )
+
+    def to_state(self) -> dict[str, Any]:
+        return {HISTORY_KEY: self.turns, SUMMARY_KEY: self.summary}
+
+    def add(self, role: str, content: str) -> None:
+        self.turns.append({"role": role, "content": content[:MAX_TURN_CHARS]})
+
+    @property
+    def needs_compaction(self) -> bool:
+        return len(self.turns) > self.max_turns
+
+    def split_for_compaction(self) -> list[dict[str, str]]:
+        """Отделить реплики, которые нужно свернуть в summary"""
+        old, self.turns = self.turns[:-self.keep_recent], self.turns[-self.keep_recent:]
+        return old
+
+    def build_messages(self, system_prompt: str) -> list[dict[str, str]]:
+        """
+        Сообщения для запроса: системный промпт, summary
+        и последние реплики в пределах token_budget.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        budget = self.token_budget
+
+        if self.summary:
+            summary = f"Краткое содержание предыдущей части диалога: {self.summary}"
+            messages.append({"role": "system", "content": summary})
+            budget -= estimate_tokens(summary)
+
+        recent = []
+        for turn in reversed(self.turns):
+            cost = estimate_tokens(turn["content"])
+            # Последнюю реплику (сообщение пользователя) берем всегда
+            if recent and cost > budget:
+                break
+            recent.append(turn)
+            budget -= cost
+
+        messages.extend(reversed(recent))
+        return messages
@@ -1,7 +1,7 @@
 import logging
 from typing import Optional, Any, Coroutine
-from openai import AsyncOpenAI
-from db_config.db_config import settings
+from services.ai_client import ai_client
+from services.conversation_memory import ConversationMemory
 
 logger = logging.getLogger(__name__)
 
@@ -10,17 +10,11 @@ class ConversationService:
     """Сервис для диалоговой практики итальянского языка"""
 
     def __init__(self):
-        self.api_key = settings.openai.api_key
-        self.enabled = settings.openai.enabled and bool(self.api_key)
-        self.client = None
+        # Клиент и пул соединений общие для всех AI-сервисов (см. ai_client)
+        self.enabled = ai_client.enabled
 
         if self.enabled:
-            try:
-                self.client = AsyncOpenAI(api_key=self.api_key)
-                logger.info("✓ Conversation service initialized")
-            except Exception as e:
-                logger.warning(f"Failed to initialize conversation service: {e}")
-                self.enabled = False
+            logger.info("✓ Conversation service initialized")
         else:
             logger.info("Conversation service disabled")
 
@@ -45,7 +39,8 @@ class ConversationService:
 
             Пример: Ciao, come stai?|Привет, как дела?"""
 
-            response = await self.client.chat.completions.create(
+            response = await ai_client.chat(
+                "conversation",
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=100,
@@ -63,24 +58,27 @@ class ConversationService:
             logger.error(f"Error starting conversation: {e}")
             return "Извините, произошла ошибка", ""
 
-    async def continue_conversation(self, user_message: str, conversation_history: list) -> tuple[str, str, list] | \
-                                                                                            tuple[str, str, list, str]:
+    async def continue_conversation(
+            self,
+            user_message: str,
+            memory: ConversationMemory
+    ) -> tuple[str, str, ConversationMemory, str]:
         """
         Продолжение диалога на основе ответа пользователя.
 
         Args:
             user_message: Сообщение пользователя на итальянском
-            conversation_history: История диалога
+            memory: Память диалога (последние реплики и summary)
 
         Returns:
-            tuple: (итальянский ответ, русский перевод, обновленная история)
+            tuple: (итальянский ответ, русский перевод, обновленная память, исправление)
         """
         if not self.enabled:
-            return "Сервис диалогов временно недоступен", "", conversation_history
+            return "Сервис диалогов временно недоступен", "", memory, ""
 
         try:
             # Добавляем сообщение пользователя в историю
-            conversation_history.append({"role": "user", "content": user_message})
+            memory.add("user", user_message)
 
             system_prompt = """Ты - терпеливый преподаватель итальянского. Веди диалог с учеником:
             1. Ответь на его сообщение естественно на итальянском
@@ -90,11 +88,11 @@ class ConversationService:
             Формат ответа:
             ИТАЛЬЯНСКИЙ_ОТВЕТ|РУССКИЙ_ПЕРЕВОД|[КОММЕНТАРИЙ_ОБ_ОШИБКАХ]"""
 
-            messages = [
-                           {"role": "system", "content": system_prompt}
-                       ] + conversation_history[-6:]  # Берем последние 6 сообщений для контекста
+            # Последние реплики в пределах бюджета токенов + summary более ранних
+            messages = memory.build_messages(system_prompt)
 
-            response = await self.client.chat.completions.create(
+            response = await ai_client.chat(
+                "conversation",
                 model="gpt-4o",
                 messages=messages,
                 max_tokens=200,
@@ -109,10 +107,65 @@ class ConversationService:
             correction = parts[2].strip() if len(parts) > 2 else ""
 
             # Добавляем ответ ассистента в историю
-            conversation_history.append({"role": "assistant", "content": italian_response})
+            memory.add("assistant", italian_response)
 
-            return italian_response, russian_translation, conversation_history, correction
+            return italian_response, russian_translation, memory, correction
 
         except Exception as e:
             logger.error(f"Error continuing conversation: {e}")
-            return "Извините, произошла ошибка", "", conversation_history, ""
\ No newline at end of file
+            return "Извините, произошла ошибка", "", memory, ""
+
+    async def compact_memory(self, memory: ConversationMemory) -> ConversationMemory:
+        """
+        Свернуть старые реплики в summary, если история превысила лимит.
+        Если запрос не удался - старые реплики просто отбрасываются,
+        предыдущий summary сохраняется.
+        """
+        if not memory.needs_compaction:
+            return memory
+
+        old_turns = memory.split_for_compaction()
+        if not self.enabled:
+            return memory
+
+        dialogue = "\n".join(
+            f"{'Ученик' if turn['role'] == 'user' else 'Преподаватель'}: {turn['content']}"
+            for turn in old_turns
+        )
+        prompt = f"""Обнови краткое содержание диалога на итальянском между учеником и преподавателем.
+            Сохрани темы разговора, факты об ученике и его типичные ошибки. Не больше 80 слов, на русском.
+
+            Текущее краткое содержание: {memory.summary or "нет"}
+
+            Новые реплики:
+            {dialogue}"""
+
+        try:
+            response = await ai_client.chat(
+                "conversation_summary",
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=150,
+                temperature=0.3
+            )
+            memory.summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning(f"Error summarizing conversation: {e}")
+
+        return memory
+
+# Global instance (lazy initialization)
+_conversation_service: Optional[ConversationService] = None
+
+
+def get_conversation_service() -> ConversationService:
+    """
+    Получение или создание экземпляра сервиса диалогов.
+
+    Returns:
+        Экземпляр ConversationService
+    """
+    global _conversation_service
+    if _conversation_service is None:
+        _conversation_service = ConversationService()
+    return _conversation_service
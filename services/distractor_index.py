@@ -0,0 +1,119 @@
+"""
+Индекс похожих переводов для дистракторов квиза.
+
+Для каждого перевода заранее (при загрузке quiz_pool) находятся
+ближайшие по написанию переводы: коэффициент Дайса по символьным
+триграммам с поправкой на близость длины. Кандидаты ищутся через
+инвертированный индекс триграмм; слишком частые триграммы (встречаются
+больше чем в MAX_POSTING переводах) пропускаются, а точно оцениваются
+не больше MAX_CANDIDATES кандидатов, так что построение линейно
+по размеру словаря. Если похожих не хватает - добираются
+ближайшие по длине. Переводы, один из которых содержит другой
+("брат" / "брат, сестра"), соседями не считаются: такой дистрактор
+может оказаться верным ответом.
+
+Результат - плоский array('i'): по k соседей на перевод, лучшие первыми,
+NO_NEIGHBOR - соседей меньше k.
+"""
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from typing import Sequence
+
+NO_NEIGHBOR = -1
+
+# Вклад близости длины в оценку (коэффициент Дайса - от 0 до 1)
+LENGTH_WEIGHT = 0.2
+
+# Триграммы, которые есть у большего числа переводов, не ищут кандидатов:
+# они почти ничего не говорят о сходстве, а перебор их списков - O(n^2)
+MAX_POSTING = 100
+# Сколько кандидатов с наибольшим числом общих триграмм оценивать точно
+MAX_CANDIDATES = 32
+# Сколько ближайших по длине переводов просматривать, добирая соседей (на одного соседа)
+LENGTH_STEPS_PER_NEIGHBOR = 4
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """Символьные триграммы нормализованного текста с границами слова"""
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def overlaps(a: str, b: str) -> bool:
+    """Один нормализованный перевод содержит другой"""
+    return a in b or b in a
+
+
+def build_neighbors(texts: Sequence[str], k: int) -> array:
+    """
+    Таблица k ближайших соседей для каждого текста.
+
+    Args:
+        texts: Уникальные переводы
+        k: Сколько соседей хранить на перевод
+
+    Returns:
+        array('i') длины len(texts) * k; соседи текста i -
+        table[i * k:(i + 1) * k] (индексы в texts)
+    """
+    n = len(texts)
+    normalized = [normalize(text) for text in texts]
+    lengths = [len(text) or 1 for text in normalized]
+    grams = [trigrams(text) for text in normalized]
+
+    postings: dict[str, list[int]] = defaultdict(list)
+    for i, text_grams in enumerate(grams):
+        for gram in text_grams:
+            postings[gram].append(i)
+
+    by_length = sorted(range(n), key=lambda i: lengths[i])
+    length_rank = [0] * n
+    for rank, i in enumerate(by_length):
+        length_rank[i] = rank
+
+    table = array('i', [NO_NEIGHBOR]) * (n * k)
+    for i in range(n):
+        shared = Counter()
+        for gram in grams[i]:
+            posting = postings[gram]
+            if len(posting) <= MAX_POSTING:
+                shared.update(posting)
+
+        def score(j: int) -> float:
+            dice = 2 * shared[j] / (len(grams[i]) + len(grams[j]))
+            return dice + LENGTH_WEIGHT * min(lengths[i], lengths[j]) / max(lengths[i], lengths[j])
+
+        shared.pop(i, None)
+        candidates = [
+            j for j, _ in shared.most_common(MAX_CANDIDATES)
+            if not overlaps(normalized[i], normalized[j])
+        ]
+        best = heapq.nlargest(k, candidates, key=score)
+
+        # Похожих по написанию мало - добираем ближайшие по длине
+        chosen = set(best)
+        lower, upper = length_rank[i] - 1, length_rank[i] + 1
+        steps = k * LENGTH_STEPS_PER_NEIGHBOR
+        while len(best) < k and steps > 0 and (lower >= 0 or upper < n):
+            steps -= 1
+            if upper >= n or (
+                lower >= 0
+                and lengths[i] - lengths[by_length[lower]] <= lengths[by_length[upper]] - lengths[i]
+            ):
+                j = by_length[lower]
+                lower -= 1
+            else:
+                j = by_length[upper]
+                upper += 1
+            if j not in chosen and not overlaps(normalized[i], normalized[j]):
+                chosen.add(j)
+                best.append(j)
+
+        table[i * k:i * k + len(best)] = array('i', best)
+
+    return table
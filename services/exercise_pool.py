@@ -0,0 +1,228 @@
+"""
+Пул заранее сгенерированных AI-упражнений.
+
+Для каждого ключа (тип, тема, уровень) в таблице exercise_pool держится
+до target_size провалидированных упражнений. Хендлер забирает упражнение
+мгновенно (один DELETE ... RETURNING), а пул пополняется в фоне.
+Пул общий для всех процессов бота: выборка идет с FOR UPDATE SKIP LOCKED,
+а пополняет ключ одновременно только один процесс - тот, что захватил
+строку exercise_pool_claim. Захват - короткая транзакция и действует
+CLAIM_TTL секунд (продлевается перед каждой генерацией), так что
+соединение с БД на время запросов к OpenAI не занимается, а захват
+упавшего процесса со временем истекает.
+"""
+import asyncio
+import logging
+import re
+import uuid
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.db_helper import db_helper
+from model.model import ExercisePoolClaim, ExercisePoolItem
+from services.exercise_service import get_exercise_service
+
+logger = logging.getLogger(__name__)
+
+# (тип упражнения, тема, уровень)
+PoolKey = tuple[str, str, str]
+
+GAP_FILL_KEY: PoolKey = ("gap_fill", "general", "beginner")
+QUIZ_KEY: PoolKey = ("quiz", "vocabulary", "beginner")
+DEFAULT_POOL_KEYS: tuple[PoolKey, ...] = (GAP_FILL_KEY, QUIZ_KEY)
+
+# Сколько действует захват пополнения пула (с запасом на одну генерацию), сек
+CLAIM_TTL = 120
+
+# Пропуск в упражнении: три и больше подчеркиваний подряд
+GAP_PATTERN = re.compile(r"_{3,}")
+
+
+class ExercisePool:
+    """Ограниченный пул упражнений в БД с фоновым пополнением"""
+
+    def __init__(
+        self,
+        keys: tuple[PoolKey, ...] = DEFAULT_POOL_KEYS,
+        target_size: int = 5,
+        interval: float = 600.0
+    ):
+        self.keys = keys
+        self.target_size = target_size
+        # Страховочное периодическое пополнение
+        self.interval = interval
+        self._refilling: dict[PoolKey, asyncio.Task] = {}
+
+    @staticmethod
+    def _filter(key: PoolKey):
+        exercise_type, topic, level = key
+        return (
+            ExercisePoolItem.exercise_type == exercise_type,
+            ExercisePoolItem.topic == topic,
+            ExercisePoolItem.level == level,
+        )
+
+    async def pop(self, key: PoolKey) -> dict[str, Any] | None:
+        """
+        Забрать упражнение из пула (или None, если пул пуст)
+        и запустить пополнение в фоне.
+        """
+        next_id = (
+            select(ExercisePoolItem.id)
+            .where(*self._filter(key))
+            .order_by(ExercisePoolItem.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        try:
+            async with db_helper.get_session() as session:
+                result = await session.execute(
+                    delete(ExercisePoolItem)
+                    .where(ExercisePoolItem.id == next_id)
+                    .returning(ExercisePoolItem.payload)
+                )
+                payload = result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error popping exercise from pool {key}: {e}")
+            payload = None
+
+        self.request_refill(key)
+        return payload
+
+    def request_refill(self, key: PoolKey) -> None:
+        """Запустить пополнение пула в фоне (если оно еще не идет)"""
+        task = self._refilling.get(key)
+        if task is None or task.done():
+            self._refilling[key] = asyncio.create_task(self._refill(key))
+
+    @staticmethod
+    async def _claim(key: PoolKey, owner: str) -> bool:
+        """
+        Захватить (или продлить) пополнение пула.
+        Удается, если захвата нет, он истек или уже принадлежит owner.
+        """
+        stmt = insert(ExercisePoolClaim).values(
+            pool_key="|".join(key),
+            owner=owner,
+            claimed_until=func.now() + timedelta(seconds=CLAIM_TTL)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ExercisePoolClaim.pool_key],
+            set_={"owner": stmt.excluded.owner, "claimed_until": stmt.excluded.claimed_until},
+            where=or_(ExercisePoolClaim.claimed_until < func.now(), ExercisePoolClaim.owner == owner)
+        ).returning(ExercisePoolClaim.owner)
+        async with db_helper.get_session() as session:
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none() is not None
+
+    @staticmethod
+    async def _release(key: PoolKey, owner: str) -> None:
+        async with db_helper.get_session() as session:
+            await session.execute(
+                delete(ExercisePoolClaim).where(
+                    ExercisePoolClaim.pool_key == "|".join(key),
+                    ExercisePoolClaim.owner == owner
+                )
+            )
+
+    async def _count(self, key: PoolKey) -> int:
+        async with db_helper.get_session() as session:
+            result = await session.execute(
+                select(func.count(ExercisePoolItem.id)).where(*self._filter(key))
+            )
+            return result.scalar_one()
+
+    async def _refill(self, key: PoolKey) -> None:
+        owner = uuid.uuid4().hex
+        try:
+            if not await self._claim(key, owner):
+                logger.debug(f"Exercise pool {key} is being refilled by another process")
+                return
+            try:
+                await self._fill(key, owner)
+            finally:
+                await self._release(key, owner)
+        except Exception as e:
+            logger.error(f"Error refilling exercise pool {key}: {e}")
+
+    async def _fill(self, key: PoolKey, owner: str) -> None:
+        """
+        Догенерировать упражнения до target_size, пересчитывая пул перед каждым.
+        Генерация идет вне транзакций; каждое упражнение вставляется отдельной.
+        """
+        added = 0
+        # Не больше 2 * target_size попыток, если генерация не проходит валидацию
+        for _ in range(self.target_size * 2):
+            if await self._count(key) >= self.target_size:
+                break
+            # Захват истек (генерация зависла) и достался другому процессу
+            if not await self._claim(key, owner):
+                logger.warning(f"Lost refill claim for exercise pool {key}")
+                break
+            exercise = await self.generate(key)
+            if exercise is None:
+                continue
+            async with db_helper.get_session() as session:
+                exercise_type, topic, level = key
+                session.add(ExercisePoolItem(
+                    exercise_type=exercise_type,
+                    topic=topic,
+                    level=level,
+                    payload=exercise
+                ))
+            added += 1
+
+        if added:
+            logger.info(f"Exercise pool {key} refilled with {added} exercises")
+
+    async def generate(self, key: PoolKey) -> dict[str, Any] | None:
+        """Сгенерировать и провалидировать упражнение (без пула)"""
+        exercise_type, topic, level = key
+        service = get_exercise_service()
+
+        if exercise_type == "gap_fill":
+            exercise = await service.generate_gap_exercise(topic=topic, level=level)
+        elif exercise_type == "quiz":
+            exercise = await service.generate_quiz(topic=topic)
+        else:
+            raise ValueError(f"Unknown exercise type: {exercise_type}")
+
+        return self.validate(exercise)
+
+    @staticmethod
+    def validate(exercise: dict[str, Any] | None) -> dict[str, Any] | None:
+        """Проверить разобранное упражнение; None если оно непригодно"""
+        if not exercise:
+            return None
+
+        if exercise.get("type") == "gap_fill":
+            text = exercise.get("exercise") or ""
+            answers = [str(answer).strip() for answer in exercise.get("answers", [])]
+            if not answers or not all(answers):
+                return None
+            # Хотя бы один пропуск, и пропусков столько же, сколько ответов
+            if len(GAP_PATTERN.findall(text)) != len(answers):
+                return None
+            return {**exercise, "answers": answers}
+
+        if exercise.get("type") == "quiz":
+            correct_answer = exercise.get("correct_answer", "").strip()[:1].upper()
+            if not exercise.get("question") or correct_answer not in ("A", "B", "C", "D"):
+                return None
+            return {**exercise, "correct_answer": correct_answer}
+
+        return None
+
+    async def run(self) -> None:
+        """Фоновая задача: заполнить пулы при старте и поддерживать их"""
+        while True:
+            for key in self.keys:
+                self.request_refill(key)
+            await asyncio.sleep(self.interval)
+
+
+exercise_pool = ExercisePool()
@@ -1,7 +1,6 @@
 import logging
 from typing import Optional, List, Dict, Any
-from openai import AsyncOpenAI
-from db_config.db_config import settings
+from services.ai_client import ai_client
 import random
 
 logger = logging.getLogger(__name__)
@@ -11,17 +10,11 @@ class ExerciseService:
     """Сервис для генерации упражнений по итальянскому"""
 
     def __init__(self):
-        self.api_key = settings.openai.api_key
-        self.enabled = settings.openai.enabled and bool(self.api_key)
-        self.client = None
+        # Клиент и пул соединений общие для всех AI-сервисов (см. ai_client)
+        self.enabled = ai_client.enabled
 
         if self.enabled:
-            try:
-                self.client = AsyncOpenAI(api_key=self.api_key)
-                logger.info("✓ Exercise service initialized")
-            except Exception as e:
-                logger.warning(f"Failed to initialize exercise service: {e}")
-                self.enabled = False
+            logger.info("✓ Exercise service initialized")
         else:
             logger.info("Exercise service disabled")
 
@@ -52,7 +45,8 @@ class ExerciseService:
             ---
             Я итальянец. Моя сестра живет в Риме."""
 
-            response = await self.client.chat.completions.create(
+            response = await ai_client.chat(
+                "exercise",
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=300,
@@ -107,7 +101,8 @@ class ExerciseService:
             ---
             'Mela' - это яблоко на итальянском."""
 
-            response = await self.client.chat.completions.create(
+            response = await ai_client.chat(
+                "exercise",
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=400,
@@ -128,4 +123,20 @@ class ExerciseService:
 
         except Exception as e:
             logger.error(f"Error generating quiz: {e}")
-            return None
\ No newline at end of file
+            return None
+
+# Global instance (lazy initialization)
+_exercise_service: Optional[ExerciseService] = None
+
+
+def get_exercise_service() -> ExerciseService:
+    """
+    Получение или создание экземпляра сервиса упражнений.
+
+    Returns:
+        Экземпляр ExerciseService
+    """
+    global _exercise_service
+    if _exercise_service is None:
+        _exercise_service = ExerciseService()
+    return _exercise_service
@@ -0,0 +1,83 @@
+"""
+Сервис идиом.
+
+Идиомы загружаются из БД один раз в компактный массив (italian, russian),
+после чего "фраза дня" выбирается за O(1) без запросов к БД.
+После импорта идиом кэш сбрасывается через invalidate().
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.model import Idiom
+from utils.datetime_utils import now_utc
+
+logger = logging.getLogger(__name__)
+
+
+class IdiomEntry(NamedTuple):
+    italian_idiom: str
+    rus_idiom: str
+
+
+class IdiomService:
+    """In-memory индекс идиом"""
+
+    def __init__(self):
+        self._idioms: tuple[IdiomEntry, ...] | None = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Сбросить кэш после изменения идиом"""
+        self._idioms = None
+
+    async def _get_idioms(self, session: AsyncSession) -> tuple[IdiomEntry, ...]:
+        if self._idioms is not None:
+            return self._idioms
+
+        async with self._lock:
+            if self._idioms is None:
+                result = await session.execute(
+                    select(Idiom.italian_idiom, Idiom.rus_idiom).order_by(Idiom.id)
+                )
+                idioms = tuple(IdiomEntry(*row) for row in result)
+                # Пустой результат не кэшируем - идиомы могут еще импортироваться
+                if not idioms:
+                    return idioms
+                self._idioms = idioms
+                logger.info(f"Idioms loaded: {len(idioms)}")
+
+        return self._idioms
+
+    async def get_phrase_of_the_day(
+        self,
+        session: AsyncSession,
+        day: date | None = None
+    ) -> IdiomEntry | None:
+        """
+        Фраза дня: одна и та же идиома для всех пользователей в течение дня
+        (и во всех процессах бота).
+
+        Args:
+            session: Database session
+            day: Дата (по умолчанию - сегодня по UTC)
+
+        Returns:
+            IdiomEntry или None, если идиом нет
+        """
+        idioms = await self._get_idioms(session)
+        if not idioms:
+            return None
+
+        day = day or now_utc().date()
+        # hash() рандомизирован между процессами, поэтому берем sha256 от даты
+        digest = hashlib.sha256(day.isoformat().encode()).digest()
+        return idioms[int.from_bytes(digest[:8], "big") % len(idioms)]
+
+
+idiom_service = IdiomService()
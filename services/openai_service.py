@@ -1,10 +1,19 @@
 import logging
-from typing import Optional
-from openai import AsyncOpenAI
-from db_config.db_config import settings
+from typing import AsyncIterator, Optional
+from services.ai_cache import ai_cache
+from services.ai_client import ai_client
+from services.ai_health import ai_health
+from utils.streaming import StreamInterrupted
 
 logger = logging.getLogger(__name__)
 
+MODEL = "gpt-4o"
+
+# Версии промптов: при изменении промпта нужно поднять версию,
+# чтобы не отдавать из кэша ответы на старый промпт
+EXPLAIN_PROMPT_VERSION = 1
+EXAMPLE_PROMPT_VERSION = 1
+
 
 class OpenAIService:
     """Сервис для взаимодействия с OpenAI API"""
@@ -12,43 +21,34 @@ class OpenAIService:
     def __init__(self, api_key: Optional[str] = None):
         """
         Инициализация сервиса OpenAI.
+        Клиент и пул соединений общие для всех AI-сервисов (см. ai_client).
         """
-        self.api_key = settings.openai.api_key
-        self.client = None
-        self.enabled = settings.openai.enabled and bool(self.api_key)
-
-        if self.api_key:
-            try:
-                self.client = AsyncOpenAI(api_key=self.api_key)
-                self.enabled = True
-                logger.info("Сервис OpenAI инициализирован")
-            except Exception as e:
-                logger.warning(f"Не удалось инициализировать OpenAI: {e}")
-                self.enabled = False
+        self.enabled = ai_client.enabled
+
+        if self.enabled:
+            logger.info("Сервис OpenAI инициализирован")
         else:
             logger.warning("Сервис OpenAI отключен - нет API ключа или сервис выключен ")
 
     async def check_api_key(self) -> bool:
         """
-        Проверка актуальности ключа API key простым запросом.
+        Проверка актуальности ключа API запросом информации о модели
+        (без генерации токенов). Результат сохраняется в ai_health.
 
         Returns:
             bool: True если API ключ работает, False в противном случае
         """
-        if not self.enabled or not self.client:
+        if not self.enabled:
             return False
 
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": "Say 'test' in Italian"}],
-                max_tokens=5
-            )
+            await ai_client.models_retrieve(MODEL)
             logger.info("ключ OpenAI API действует")
+            ai_health.record_success()
             return True
         except Exception as e:
             logger.error(f"Тест ключа OpenAI API не прошел: {e}")
-            self.enabled = False
+            ai_health.record_failure(e)
             return False
 
     async def explain_word(
@@ -70,40 +70,103 @@ class OpenAIService:
             logger.warning("OpenAI service is disabled")
             return None
 
-        try:
-            # ИСПРАВЛЕНО: Упрощенный промпт без перевода
-            prompt = f"""Ты - преподаватель итальянского языка для русскоговорящих студентов.
-
-        Слово: {italian_word}
-
-        Дай краткое объяснение (максимум 250 слов):
-        1. Перевод на русский
-        2. 2-3 примера использования в итальянских предложениях с переводом
-        3. 1-2 синонима (если есть)
-        4. Короткую мнемоническую подсказку для запоминания
+        cached = await ai_cache.get("explain", italian_word, MODEL, EXPLAIN_PROMPT_VERSION)
+        if cached:
+            logger.info(f"Explanation for word {italian_word} served from cache")
+            return cached
 
-        Формат ответа должен быть понятным и структурированным."""
-
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system",
-                     "content": "Ты - опытный преподаватель итальянского языка для русских студентов."},
-                    {"role": "user", "content": prompt}
-                ],
+        try:
+            response = await ai_client.chat(
+                "explain",
+                model=MODEL,
+                messages=self._explain_messages(italian_word),
                 max_tokens=600,
                 temperature=0.7
             )
 
+            ai_health.record_success()
             explanation = response.choices[0].message.content
             logger.info(f"Generated explanation for word: {italian_word}")
 
+            if explanation:
+                await ai_cache.set("explain", italian_word, MODEL, EXPLAIN_PROMPT_VERSION, explanation)
+
             return explanation
 
         except Exception as e:
             logger.error(f"Ошибка генерации объяснения: {e}")
+            ai_health.record_failure(e)
             return None
 
+    async def explain_word_stream(self, italian_word: str) -> AsyncIterator[str]:
+        """
+        Потоковая генерация объяснения для итальянского слова.
+
+        Args:
+            italian_word: слово для объяснения
+
+        Yields:
+            Накопленный на данный момент текст объяснения.
+            Если сервис недоступен - ничего
+
+        Raises:
+            StreamInterrupted: Ошибка генерации (выданный текст неполный)
+        """
+        if not self.enabled:
+            logger.warning("OpenAI service is disabled")
+            return
+
+        cached = await ai_cache.get("explain", italian_word, MODEL, EXPLAIN_PROMPT_VERSION)
+        if cached:
+            logger.info(f"Explanation for word {italian_word} served from cache")
+            yield cached
+            return
+
+        explanation = ""
+        try:
+            async for delta in ai_client.chat_stream(
+                "explain",
+                model=MODEL,
+                messages=self._explain_messages(italian_word),
+                max_tokens=600,
+                temperature=0.7
+            ):
+                explanation += delta
+                yield explanation
+
+            ai_health.record_success()
+            logger.info(f"Generated explanation for word: {italian_word} (stream)")
+
+        except Exception as e:
+            logger.error(f"Ошибка генерации объяснения: {e}")
+            ai_health.record_failure(e)
+            raise StreamInterrupted(str(e)) from e
+
+        if explanation:
+            await ai_cache.set("explain", italian_word, MODEL, EXPLAIN_PROMPT_VERSION, explanation)
+
+    @staticmethod
+    def _explain_messages(italian_word: str) -> list[dict[str, str]]:
+        """Сообщения для запроса объяснения слова"""
+        # ИСПРАВЛЕНО: Упрощенный промпт без перевода
+        prompt = f"""Ты - преподаватель итальянского языка для русскоговорящих студентов.
+
+        Слово: {italian_word}
+
+        Дай краткое объяснение (максимум 250 слов):
+        1. Перевод на русский
+        2. 2-3 примера использования в итальянских предложениях с переводом
+        3. 1-2 синонима (если есть)
+        4. Короткую мнемоническую подсказку для запоминания
+
+        Формат ответа должен быть понятным и структурированным."""
+
+        return [
+            {"role": "system",
+             "content": "Ты - опытный преподаватель итальянского языка для русских студентов."},
+            {"role": "user", "content": prompt}
+        ]
+
     async def generate_example_sentence(
             self,
             italian_word: str
@@ -120,20 +183,32 @@ class OpenAIService:
         if not self.enabled:
             return None
 
+        cached = await ai_cache.get("example", italian_word, MODEL, EXAMPLE_PROMPT_VERSION)
+        if cached:
+            return cached
+
         try:
             prompt = f"Придумай одно простое итальянское предложение со словом '{italian_word}' и переведи его на русский. Формат: 'Итальянское предложение | Русский перевод'"
 
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
+            response = await ai_client.chat(
+                "example",
+                model=MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=100,
                 temperature=0.7
             )
 
-            return response.choices[0].message.content
+            ai_health.record_success()
+            example = response.choices[0].message.content
+
+            if example:
+                await ai_cache.set("example", italian_word, MODEL, EXAMPLE_PROMPT_VERSION, example)
+
+            return example
 
         except Exception as e:
             logger.error(f"Error generating sentence: {e}")
+            ai_health.record_failure(e)
             return None
 
 
@@ -157,6 +232,8 @@ def get_openai_service() -> OpenAIService:
 async def is_openai_available() -> bool:
     """
     Проверка доступности сервиса OpenAI.
+    Запросов к API не делает - возвращает состояние, которое
+    поддерживает ai_health (фоновые проверки + результаты запросов).
 
     Returns:
         bool: True если сервис доступен и работает
@@ -164,4 +241,4 @@ async def is_openai_available() -> bool:
     service = get_openai_service()
     if not service.enabled:
         return False
-    return await service.check_api_key()
\ No newline at end of file
+    return ai_health.is_available
@@ -0,0 +1,240 @@
+"""
+Пул вопросов для квиза по темам.
+
+Словарь загружается из БД один раз (одним запросом) и хранится в памяти
+в компактном виде. Вопрос (слово + 3 варианта-дистрактора) строится
+за O(1) без обращений к БД. После изменения словаря пул нужно
+сбросить через invalidate() - он перезагрузится при следующем вопросе.
+
+Дистракторы берутся из заранее построенных таблиц похожих переводов
+(services.distractor_index): сначала из таблицы темы, а если в теме мало
+слов - из таблицы всего словаря, которая строится один раз при загрузке
+словаря. Случайные переводы - только если не хватило и их.
+"""
+import asyncio
+import logging
+import random
+from array import array
+from typing import Callable, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.model import Vocabulary
+from services.distractor_index import NO_NEIGHBOR, build_neighbors, normalize, overlaps
+
+logger = logging.getLogger(__name__)
+
+# Сколько неправильных вариантов показывать в вопросе
+DISTRACTORS_COUNT = 3
+# Сколько похожих переводов хранить на перевод; дистракторы выбираются среди них
+NEIGHBORS_COUNT = 8
+# Сколько случайных переводов словаря просматривать, если не хватило похожих
+FALLBACK_SAMPLE = 16
+
+
+class QuizQuestion(NamedTuple):
+    word_id: int
+    italian: str
+    russian: str
+    options: list[str]
+
+
+class ThemePool(NamedTuple):
+    """Слова одной темы"""
+    # (id, italian, russian)
+    words: tuple[tuple[int, str, str], ...]
+    # Уникальные переводы темы - кандидаты в дистракторы
+    translations: tuple[str, ...]
+    # Индекс перевода слова words[i] в translations
+    translation_index: tuple[int, ...]
+    # id слова -> его позиция в words
+    word_index: dict[int, int]
+    # Похожие переводы темы: для translations[i] - индексы в translations
+    # neighbors[i * NEIGHBORS_COUNT:(i + 1) * NEIGHBORS_COUNT]
+    neighbors: array
+    # Индекс translations[i] в переводах всего словаря (QuizPool._translations)
+    global_index: tuple[int, ...]
+
+
+class QuizPool:
+    """In-memory индекс слов по темам для генерации вопросов квиза"""
+
+    def __init__(self):
+        self._themes: dict[int, ThemePool] = {}
+        # Уникальные переводы всего словаря и их похожие переводы (как ThemePool.neighbors) -
+        # запас дистракторов для маленьких тем
+        self._translations: tuple[str, ...] = ()
+        self._neighbors = array('i')
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        # Увеличивается при каждой перезагрузке словаря
+        self.version = 0
+
+    def invalidate(self) -> None:
+        """Сбросить пул после изменения словаря"""
+        self._loaded = False
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Загрузить словарь, если он еще не загружен или был сброшен"""
+        if self._loaded:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self.load(session)
+
+    async def load(self, session: AsyncSession) -> None:
+        """Загрузить весь словарь одним запросом и построить индекс по темам"""
+        result = await session.execute(
+            select(
+                Vocabulary.theme_id,
+                Vocabulary.id,
+                Vocabulary.italian_word,
+                Vocabulary.rus_word
+            ).order_by(Vocabulary.theme_id, Vocabulary.id)
+        )
+
+        grouped: dict[int, list[tuple[int, str, str]]] = {}
+        for theme_id, word_id, italian, russian in result:
+            grouped.setdefault(theme_id, []).append((word_id, italian, russian))
+
+        # Таблицы похожих переводов считаются вне event loop
+        themes, self._translations, self._neighbors = await asyncio.to_thread(self._build_index, grouped)
+        self._themes = themes
+        self._loaded = True
+        self.version += 1
+        logger.info(
+            f"Quiz pool loaded: {len(themes)} themes, "
+            f"{sum(len(pool.words) for pool in themes.values())} words (version {self.version})"
+        )
+
+    async def get_question(
+        self,
+        session: AsyncSession,
+        theme_id: int,
+        pick: Callable[[ThemePool], int] | None = None
+    ) -> QuizQuestion | None:
+        """
+        Вопрос по теме.
+
+        Args:
+            session: Database session
+            theme_id: ID темы
+            pick: Выбор слова - получает пул темы и возвращает индекс
+                в pool.words (например, word_selector); по умолчанию - случайное
+
+        Returns:
+            QuizQuestion или None, если в теме нет слов
+        """
+        await self.ensure_loaded(session)
+
+        pool = self._themes.get(theme_id)
+        if not pool:
+            return None
+
+        index = pick(pool) if pick is not None else random.randrange(len(pool.words))
+        return self._build_question(pool, index)
+
+    async def get_word_question(
+        self,
+        session: AsyncSession,
+        theme_id: int,
+        word_id: int
+    ) -> QuizQuestion | None:
+        """
+        Вопрос по конкретному слову (режим повторения).
+
+        Returns:
+            QuizQuestion или None, если слова нет в пуле
+        """
+        await self.ensure_loaded(session)
+
+        pool = self._themes.get(theme_id)
+        if not pool or word_id not in pool.word_index:
+            return None
+        return self._build_question(pool, pool.word_index[word_id])
+
+    @staticmethod
+    def _build_index(
+        grouped: dict[int, list[tuple[int, str, str]]]
+    ) -> tuple[dict[int, ThemePool], tuple[str, ...], array]:
+        """
+        Пулы тем и таблица похожих переводов всего словаря.
+
+        Args:
+            grouped: Слова (id, italian, russian) по темам
+
+        Returns:
+            (пулы тем, уникальные переводы словаря, их таблица соседей)
+        """
+        global_positions: dict[str, int] = {}
+        for words in grouped.values():
+            for _, _, russian in words:
+                global_positions.setdefault(russian, len(global_positions))
+        translations = tuple(global_positions)
+
+        themes = {}
+        for theme_id, words in grouped.items():
+            positions: dict[str, int] = {}
+            for _, _, russian in words:
+                positions.setdefault(russian, len(positions))
+            themes[theme_id] = ThemePool(
+                words=tuple(words),
+                translations=tuple(positions),
+                translation_index=tuple(positions[russian] for _, _, russian in words),
+                word_index={word_id: i for i, (word_id, _, _) in enumerate(words)},
+                neighbors=build_neighbors(tuple(positions), NEIGHBORS_COUNT),
+                global_index=tuple(global_positions[russian] for russian in positions)
+            )
+
+        return themes, translations, build_neighbors(translations, NEIGHBORS_COUNT)
+
+    def _build_question(self, pool: ThemePool, index: int) -> QuizQuestion:
+        word_id, italian, russian = pool.words[index]
+        options = [russian] + self._pick_distractors(pool, pool.translation_index[index])
+        random.shuffle(options)
+
+        return QuizQuestion(word_id=word_id, italian=italian, russian=russian, options=options)
+
+    def _pick_distractors(self, pool: ThemePool, own_index: int) -> list[str]:
+        """
+        Выбрать до DISTRACTORS_COUNT уникальных переводов, похожих на правильный.
+        Случайные среди NEIGHBORS_COUNT ближайших - чтобы варианты не повторялись.
+        """
+        start = own_index * NEIGHBORS_COUNT
+        candidates = [
+            pool.translations[i]
+            for i in pool.neighbors[start:start + NEIGHBORS_COUNT]
+            if i != NO_NEIGHBOR
+        ]
+
+        if len(candidates) < DISTRACTORS_COUNT:
+            # В теме мало слов - добираем похожие переводы из других тем
+            own = pool.translations[own_index]
+            start = pool.global_index[own_index] * NEIGHBORS_COUNT
+            extra = [
+                self._translations[i]
+                for i in self._neighbors[start:start + NEIGHBORS_COUNT]
+                if i != NO_NEIGHBOR and self._translations[i] not in candidates
+            ]
+            random.shuffle(extra)
+            candidates += extra[:DISTRACTORS_COUNT - len(candidates)]
+
+        if len(candidates) < DISTRACTORS_COUNT:
+            # Похожих нет совсем (крошечный словарь) - случайные переводы
+            normalized = normalize(own)
+            sample_size = min(FALLBACK_SAMPLE, len(self._translations))
+            for translation in random.sample(self._translations, sample_size):
+                if len(candidates) == DISTRACTORS_COUNT:
+                    break
+                if (
+                    translation != own
+                    and translation not in candidates
+                    and not overlaps(normalized, normalize(translation))
+                ):
+                    candidates.append(translation)
+
+        return random.sample(candidates, min(DISTRACTORS_COUNT, len(candidates)))
+
+
+quiz_pool = QuizPool()
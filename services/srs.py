@@ -0,0 +1,131 @@
+"""
+Интервальные повторения по алгоритму SM-2.
+
+После каждого ответа пересчитываются easiness_factor, interval_days
+и next_review_date слова. Слова, у которых next_review_date наступил,
+попадают в очередь повторения (UserService.get_words_for_review).
+"""
+import math
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import Float, Integer, Interval, case, cast, func, literal
+from sqlalchemy.sql.elements import ColumnElement
+
+# Статусы слов, которые участвуют в повторении (освоенные - нет).
+# Должны совпадать с условием частичного индекса ix_user_word_progress_due
+REVIEW_STATUSES = ('new', 'learning', 'learned')
+
+DEFAULT_EASINESS = 2.5
+MIN_EASINESS = 1.3
+
+# Оценка ответа по шкале SM-2 (0-5): в квизе только "верно" / "неверно"
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+
+
+class ReviewSchedule(NamedTuple):
+    repetitions: int
+    easiness_factor: float
+    interval_days: int
+    next_review_date: datetime
+
+
+def answer_quality(is_correct: bool) -> int:
+    return CORRECT_QUALITY if is_correct else WRONG_QUALITY
+
+
+def next_easiness(easiness_factor: float, quality: int) -> float:
+    """EF' = EF + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02)), не меньше 1.3"""
+    return max(MIN_EASINESS, easiness_factor + _easiness_delta(quality))
+
+
+def _easiness_delta(quality: int) -> float:
+    return 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+
+
+def schedule(
+    repetitions: int | None,
+    easiness_factor: float | None,
+    interval_days: int | None,
+    quality: int,
+    now: datetime
+) -> ReviewSchedule:
+    """
+    Следующее повторение по SM-2.
+
+    Args:
+        repetitions: Успешных повторений подряд до этого ответа
+        easiness_factor: Текущий фактор легкости
+        interval_days: Текущий интервал
+        quality: Оценка ответа 0-5 (>= 3 - вспомнил)
+        now: Время ответа
+
+    Returns:
+        ReviewSchedule с новыми значениями
+    """
+    repetitions = repetitions or 0
+    easiness_factor = easiness_factor or DEFAULT_EASINESS
+    interval_days = interval_days or 0
+
+    if quality >= 3:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = math.ceil(interval_days * easiness_factor)
+        repetitions += 1
+    else:
+        # Забыл - начинаем серию заново, повторить завтра
+        repetitions = 0
+        interval_days = 1
+
+    easiness_factor = next_easiness(easiness_factor, quality)
+
+    return ReviewSchedule(
+        repetitions=repetitions,
+        easiness_factor=easiness_factor,
+        interval_days=interval_days,
+        next_review_date=now + timedelta(days=interval_days),
+    )
+
+
+def schedule_sql(
+    repetitions: ColumnElement,
+    easiness_factor: ColumnElement,
+    interval_days: ColumnElement,
+    quality: int,
+    now: datetime
+) -> dict[str, ColumnElement]:
+    """
+    То же, что schedule(), но SQL-выражениями над текущими значениями
+    колонок - для UPDATE без предварительного SELECT.
+
+    Returns:
+        dict {имя колонки: выражение} для repetitions, easiness_factor,
+        interval_days и next_review_date
+    """
+    repetitions = func.coalesce(repetitions, 0)
+    easiness_factor = func.coalesce(easiness_factor, DEFAULT_EASINESS)
+    interval_days = func.coalesce(interval_days, 0)
+
+    if quality >= 3:
+        new_interval = case(
+            (repetitions == 0, 1),
+            (repetitions == 1, 6),
+            else_=cast(func.ceil(interval_days * easiness_factor), Integer),
+        )
+        new_repetitions = repetitions + 1
+    else:
+        new_interval = literal(1)
+        new_repetitions = literal(0)
+
+    return {
+        "repetitions": new_repetitions,
+        "easiness_factor": func.greatest(
+            MIN_EASINESS, cast(easiness_factor + _easiness_delta(quality), Float)
+        ),
+        "interval_days": new_interval,
+        "next_review_date": literal(now) + func.make_interval(0, 0, 0, new_interval, type_=Interval),
+    }
@@ -0,0 +1,67 @@
+"""
+Кэш списка тем и клавиатуры тем.
+
+Темы меняются только при импорте словаря, поэтому провалидированный
+список тем и готовая InlineKeyboardMarkup строятся один раз и отдаются
+из памяти. Импорт сбрасывает кэш через invalidate().
+"""
+import asyncio
+import logging
+
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.functions import get_all_themes
+from inline_keyboard.inline_kb_w_call_back import theme_keyboard
+from schemas.schemas import ThemeRead
+
+logger = logging.getLogger(__name__)
+
+
+class ThemeCache:
+    """Версионированный кэш тем и клавиатуры тем"""
+
+    def __init__(self):
+        self._themes: list[ThemeRead] | None = None
+        self._keyboard: InlineKeyboardMarkup | None = None
+        self._lock = asyncio.Lock()
+        # Увеличивается при каждом сбросе кэша
+        self.version = 0
+
+    def invalidate(self) -> None:
+        """Сбросить кэш после изменения тем"""
+        self._themes = None
+        self._keyboard = None
+        self.version += 1
+
+    async def get_themes(self, session: AsyncSession) -> list[ThemeRead]:
+        """Список тем (из кэша или из БД)"""
+        if self._themes is not None:
+            return self._themes
+
+        async with self._lock:
+            if self._themes is None:
+                version = self.version
+                themes = await get_all_themes(session)
+                # Пустой список не кэшируем: get_all_themes возвращает [] и при ошибке БД
+                if themes and version == self.version:
+                    self._themes = themes
+                    logger.info(f"Theme cache loaded: {len(themes)} themes (version {version})")
+                return themes
+
+        return self._themes
+
+    async def get_keyboard(self, session: AsyncSession) -> InlineKeyboardMarkup:
+        """Клавиатура тем (из кэша или построенная заново)"""
+        if self._keyboard is not None:
+            return self._keyboard
+
+        version = self.version
+        themes = await self.get_themes(session)
+        keyboard = await theme_keyboard(themes)
+        if themes and version == self.version:
+            self._keyboard = keyboard
+        return keyboard
+
+
+theme_cache = ThemeCache()
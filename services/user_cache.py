@@ -0,0 +1,141 @@
+"""
+In-process кэш пользователей для UserMiddleware.
+
+Хранит объекты User по telegram_id (LRU + TTL), чтобы не делать SELECT
+на каждое обновление. Изменения профиля и streak применяются к объекту
+в памяти и записываются в БД пачкой в фоне (write-behind).
+Пользователь с незаписанными изменениями не вытесняется (ни по TTL,
+ни по LRU), а если он все же загружен из БД заново - изменения
+накладываются на загруженный объект.
+
+Кэш свой у каждого процесса. Бот рассчитан на один процесс обработки
+обновлений (см. middleware.scheduler_middleware); если рядом работает
+другой процесс (например, старая реплика во время перезапуска), изменения
+уровня, streak и т.п. он видит с задержкой до ttl секунд, а незаписанные
+изменения разных процессов записываются по принципу "последний выигрывает".
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database.db_helper import db_helper
+from model.model import User
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """LRU/TTL кэш пользователей с отложенной записью изменений"""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        # user.id -> {колонка: значение}, ожидающие записи в БД
+        self._pending: dict[int, dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int) -> User | None:
+        """Получить пользователя из кэша или None"""
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, user = entry
+        # Пользователь с незаписанными изменениями не вытесняется по TTL,
+        # иначе из БД прочитаются устаревшие значения
+        if time.monotonic() - stored_at > self.ttl and user.id not in self._pending:
+            del self._entries[telegram_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return user
+
+    def put(self, user: User) -> None:
+        """Положить пользователя в кэш"""
+        # Загруженная из БД строка еще не содержит отложенных изменений
+        for key, value in self._pending.get(user.id, {}).items():
+            set_committed_value(user, key, value)
+
+        self._entries[user.telegram_id] = (time.monotonic(), user)
+        self._entries.move_to_end(user.telegram_id)
+        if len(self._entries) > self.maxsize:
+            self._evict(len(self._entries) - self.maxsize)
+
+    def _evict(self, count: int) -> None:
+        """Вытеснить count самых старых пользователей без незаписанных изменений"""
+        evicted = list(islice(
+            (telegram_id for telegram_id, (_, user) in self._entries.items() if user.id not in self._pending),
+            count
+        ))
+        for telegram_id in evicted:
+            del self._entries[telegram_id]
+
+    def invalidate(self, telegram_id: int) -> None:
+        """Удалить пользователя из кэша"""
+        self._entries.pop(telegram_id, None)
+
+    def apply_changes(self, user: User, changes: dict[str, Any]) -> None:
+        """
+        Применить изменения к объекту в кэше и поставить их в очередь на запись.
+        Объект не помечается как измененный в сессии SQLAlchemy.
+        """
+        for key, value in changes.items():
+            set_committed_value(user, key, value)
+        self._pending.setdefault(user.id, {}).update(changes)
+
+    async def flush(self) -> int:
+        """
+        Записать накопленные изменения в БД одним пакетным UPDATE.
+
+        Returns:
+            Количество обновленных пользователей
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        rows = [{"id": user_id, **changes} for user_id, changes in pending.items()]
+
+        try:
+            async with db_helper.get_session() as session:
+                await session.execute(update(User), rows)
+        except Exception as e:
+            # Возвращаем изменения в очередь, не затирая более свежие
+            for user_id, changes in pending.items():
+                self._pending[user_id] = {**changes, **self._pending.get(user_id, {})}
+            logger.error(f"Error flushing user cache: {e}")
+            return 0
+
+        logger.info(f"Flushed {len(rows)} cached users, cache stats: {self.stats()}")
+        return len(rows)
+
+    async def run_flusher(self, interval: float = 30.0) -> None:
+        """Фоновая задача периодической записи изменений"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        """Статистика кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+            "pending": len(self._pending),
+        }
+
+
+user_cache = UserCache()
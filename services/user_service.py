@@ -1,12 +1,38 @@
 from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, case, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.orm.attributes import set_committed_value
 from model.model import User, UserWordProgress, TrainingSession, Vocabulary
 from utils.datetime_utils import now_utc
+from services import srs
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Статусы слов, которые учитываются в total_words_learned
+LEARNED_STATUSES = ('learned', 'mastered')
+
+
+class WordProgressUpdate(NamedTuple):
+    """Прогресс по слову после ответа"""
+    status: str
+    # None - на слово отвечали впервые
+    old_status: str | None
+    correct_count: int
+    wrong_count: int
+    next_review_date: datetime
+
+
+class WordStatus(NamedTuple):
+    """Прогресс по слову в карте прогресса квиза (хранится в FSM)"""
+    status: str
+    correct_count: int
+    wrong_count: int
+    next_review_date: datetime | None
+
 
 class UserService:
     """Сервис для работы с пользователями"""
@@ -60,53 +86,68 @@ class UserService:
                 logger.error(f"Error creating user {telegram_id}: {e}")
                 raise
         else:
-            # Обновляем данные пользователя если они изменились
-            if (user.username != username or
-                    user.first_name != first_name or
-                    user.last_name != last_name):
-                user.username = username
-                user.first_name = first_name
-                user.last_name = last_name
+            # Обновляем профиль и streak, коммит - только если что-то изменилось
+            changes = UserService.get_activity_changes(user, username, first_name, last_name)
+            if changes:
+                for key, value in changes.items():
+                    setattr(user, key, value)
                 await session.commit()
 
-            # Обновить streak при возвращении
-            await UserService._update_streak(session, user)
-
         return user
 
-    
     @staticmethod
-    async def _update_streak(session: AsyncSession, user: User) -> None:
+    def get_activity_changes(
+        user: User,
+        username: str | None = None,
+        first_name: str | None = None,
+        last_name: str | None = None
+    ) -> dict:
         """
-        Обновить streak пользователя.
+        Вычислить изменения профиля и streak при очередном обращении пользователя.
+        Сам объект пользователя не изменяется.
+
+        Returns:
+            dict {имя колонки: новое значение}, пустой если менять нечего
+        """
+        changes = {}
+        if (user.username != username or
+                user.first_name != first_name or
+                user.last_name != last_name):
+            changes.update(username=username, first_name=first_name, last_name=last_name)
+
+        changes.update(UserService._get_streak_changes(user))
+        return changes
+
+    @staticmethod
+    def _get_streak_changes(user: User) -> dict:
+        """
+        Вычислить новый streak пользователя.
         Если пользователь приходит каждый день - streak растет.
         Если пропустил день - сбрасывается.
+        В течение одного дня изменений нет.
         """
         now = UserService._now()
-        
+
         if not user.last_activity_date:
-            user.current_streak = 1
-            user.last_activity_date = now
-        else:
-            days_since_last = (now - user.last_activity_date).days
-            
-            if days_since_last == 0:
-                # Активность в тот же день - ничего не меняем
-                pass
-            elif days_since_last == 1:
-                # Следующий день подряд - увеличиваем streak
-                user.current_streak += 1
-                user.last_activity_date = now
-                
-                if user.current_streak > user.longest_streak:
-                    user.longest_streak = user.current_streak
-            else:
-                # Пропустил дни - сброс streak
-                user.current_streak = 1
-                user.last_activity_date = now
-        
-        await session.commit()
-    
+            return {'current_streak': 1, 'last_activity_date': now}
+
+        days_since_last = (now - user.last_activity_date).days
+
+        if days_since_last == 0:
+            # Активность в тот же день - ничего не меняем
+            return {}
+
+        if days_since_last == 1:
+            # Следующий день подряд - увеличиваем streak
+            current_streak = user.current_streak + 1
+            changes = {'current_streak': current_streak, 'last_activity_date': now}
+            if current_streak > user.longest_streak:
+                changes['longest_streak'] = current_streak
+            return changes
+
+        # Пропустил дни - сброс streak
+        return {'current_streak': 1, 'last_activity_date': now}
+
     @staticmethod
     async def get_user_stats(
         session: AsyncSession,
@@ -164,139 +205,205 @@ class UserService:
         session: AsyncSession,
         user_id: int,
         word_id: int,
-        is_correct: bool
-    ) -> UserWordProgress:
+        is_correct: bool,
+        user: User | None = None
+    ) -> WordProgressUpdate:
         """
         Обновить прогресс пользователя по конкретному слову.
-        
+
+        Один запрос: INSERT ... ON CONFLICT (user_id, word_id) DO UPDATE
+        с инкрементами счетчиков, статусом и расписанием SM-2 в SQL,
+        а в том же запросе - UPDATE общей статистики пользователя
+        (счетчики, XP, уровень, total_words_learned). Повторный ответ
+        на то же слово не создает дубликат строки - уникальный индекс
+        uq_user_word_progress_user_word.
+
         Args:
             session: Database session
             user_id: User ID
             word_id: Word ID
             is_correct: Правильно ли ответил пользователь
-            
+            user: Объект пользователя (опционально) - его счетчики
+                синхронизируются с результатом UPDATE без повторного SELECT
+
         Returns:
-            Updated UserWordProgress object
+            WordProgressUpdate с новым и прежним статусом слова
         """
-        result = await session.execute(
-            select(UserWordProgress).where(
-                UserWordProgress.user_id == user_id,
-                UserWordProgress.word_id == word_id
+        now = UserService._now()
+        quality = srs.answer_quality(is_correct)
+        progress = UserWordProgress.__table__.c
+
+        # Первый ответ на слово - обычный INSERT
+        first = srs.schedule(0, srs.DEFAULT_EASINESS, 0, quality, now)
+        insert_stmt = insert(UserWordProgress.__table__).values(
+            user_id=user_id,
+            word_id=word_id,
+            status='new',
+            correct_count=int(is_correct),
+            wrong_count=int(not is_correct),
+            repetitions=first.repetitions,
+            easiness_factor=first.easiness_factor,
+            interval_days=first.interval_days,
+            next_review_date=first.next_review_date,
+            first_seen_at=now,
+            last_reviewed_at=now,
+        )
+
+        # Повторный - UPDATE существующей строки выражениями над ее колонками
+        correct_count = func.coalesce(progress.correct_count, 0) + int(is_correct)
+        wrong_count = func.coalesce(progress.wrong_count, 0) + int(not is_correct)
+        upserted = (
+            insert_stmt.on_conflict_do_update(
+                index_elements=[progress.user_id, progress.word_id],
+                set_={
+                    'correct_count': correct_count,
+                    'wrong_count': wrong_count,
+                    'status': UserService._next_status(progress.status, correct_count, wrong_count),
+                    'last_reviewed_at': now,
+                    **srs.schedule_sql(
+                        progress.repetitions,
+                        progress.easiness_factor,
+                        progress.interval_days,
+                        quality,
+                        now
+                    ),
+                }
             )
+            .returning(progress.status, progress.correct_count, progress.wrong_count, progress.next_review_date)
+            .cte('upserted')
         )
-        progress = result.scalar_one_or_none()
-        
-        if not progress:
-            progress = UserWordProgress(
-                user_id=user_id,
-                word_id=word_id,
-                status='new',
-                first_seen_at=UserService._now(),
-                correct_count=0,
-                wrong_count=0,
-                repetitions=0
+        # Статус до ответа: все CTE видят снимок данных на начало запроса
+        old = (
+            select(progress.status)
+            .where(progress.user_id == user_id, progress.word_id == word_id)
+            .cte('old_progress')
+        )
+
+        new_status = select(upserted.c.status).scalar_subquery()
+        old_status = select(old.c.status).scalar_subquery()
+        learned_delta = UserService._is_learned(new_status) - UserService._is_learned(old_status)
+
+        result = await session.execute(
+            UserService._user_stats_update(user_id, is_correct, learned_delta)
+            .add_cte(old, upserted)
+            .returning(
+                new_status.label('status'),
+                old_status.label('old_status'),
+                select(upserted.c.correct_count).scalar_subquery().label('correct_count'),
+                select(upserted.c.wrong_count).scalar_subquery().label('wrong_count'),
+                select(upserted.c.next_review_date).scalar_subquery().label('next_review_date'),
             )
-            session.add(progress)
-            logger.info(f"Created new word progress: user_id={user_id}, word_id={word_id}")
+        )
+        row = result.one()._asdict()
 
-        logger.info(
-            f"Current progress: status={progress.status}, correct={progress.correct_count}, wrong={progress.wrong_count}")
-        if progress.correct_count is None:
-            progress.correct_count = 0
-        if progress.wrong_count is None:
-            progress.wrong_count = 0
-        if progress.repetitions is None:
-            progress.repetitions = 0
-
-        # Обновить счетчики
-        if is_correct:
-            progress.correct_count += 1
-            progress.repetitions += 1
-        else:
-            progress.wrong_count += 1
-            progress.repetitions = 0
-        old_status = progress.status
-        # Обновить статус на основе успешности
-        if progress.correct_count >= 3 and progress.status == 'new':
-            progress.status = 'learning'
-            logger.info(f"Word {word_id} status changed from {old_status} to {progress.status}")
-        elif progress.correct_count >= 7 and progress.status == 'learning':
-            progress.status = 'learned'
-            logger.info(f"Word {word_id} status changed from {old_status} to {progress.status}")
-        elif progress.correct_count >= 15 and progress.accuracy > 90:
-            progress.status = 'mastered'
-            logger.info(f"Word {word_id} status changed from {old_status} to {progress.status}")
-        else:
-            logger.info(
-                f"Word {word_id} status remains {progress.status} (correct={progress.correct_count}, accuracy={progress.accuracy})")
-        
-        progress.last_reviewed_at = UserService._now()
-        
         await session.commit()
-        await session.refresh(progress)
-        
-        # Обновить общую статистику пользователя
-        await UserService._update_user_stats(session, user_id, is_correct)
-        
-        return progress
-    
+
+        word_progress = WordProgressUpdate(**{key: row.pop(key) for key in WordProgressUpdate._fields})
+        if word_progress.old_status is None:
+            logger.info(f"Created new word progress: user_id={user_id}, word_id={word_id}")
+        elif word_progress.status != word_progress.old_status:
+            logger.info(f"Word {word_id} status changed from {word_progress.old_status} to {word_progress.status}")
+
+        if user is not None:
+            if row['level'] > user.level:
+                logger.info(f"User {user_id} leveled up to {row['level']}!")
+            for key, value in row.items():
+                set_committed_value(user, key, value)
+
+        return word_progress
+
     @staticmethod
-    async def _update_user_stats(
-        session: AsyncSession,
-        user_id: int,
-        is_correct: bool
-    ) -> None:
-        """Обновить общую статистику пользователя"""
-        result = await session.execute(
-            select(User).where(User.id == user_id)
+    def _next_status(status: ColumnElement, correct_count: ColumnElement, wrong_count: ColumnElement) -> ColumnElement:
+        """Статус слова по счетчикам ответов (SQL-выражение для UPDATE)"""
+        return case(
+            (and_(correct_count >= 3, status == 'new'), 'learning'),
+            (and_(correct_count >= 7, status == 'learning'), 'learned'),
+            # Точность больше 90% без деления
+            (and_(correct_count >= 15, correct_count * 100 > (correct_count + wrong_count) * 90), 'mastered'),
+            else_=status
         )
-        user = result.scalar_one()
-        
-        if is_correct:
-            user.total_correct_answers += 1
-        else:
-            user.total_wrong_answers += 1
-        
-        # Подсчитать изученные слова (learned + mastered)
-        learned_words_query = select(func.count(UserWordProgress.id)).where(
-            UserWordProgress.user_id == user_id,
-            UserWordProgress.status.in_(['learned', 'mastered'])
+
+    @staticmethod
+    def _is_learned(status: ColumnElement) -> ColumnElement:
+        """1, если статус учитывается в total_words_learned, иначе 0 (и для NULL)"""
+        return case((status.in_(LEARNED_STATUSES), 1), else_=0)
+
+    @staticmethod
+    def _user_stats_update(user_id: int, is_correct: bool, learned_delta: int | ColumnElement):
+        """
+        UPDATE общей статистики пользователя с инкрементами в SQL.
+        Возвращает новые значения счетчиков через RETURNING.
+        """
+        xp = 10 if is_correct else 2
+
+        return (
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                total_correct_answers=User.total_correct_answers + int(is_correct),
+                total_wrong_answers=User.total_wrong_answers + int(not is_correct),
+                total_words_learned=User.total_words_learned + learned_delta,
+                experience_points=User.experience_points + xp,
+                # Каждые 100 очков = +1 уровень
+                level=func.greatest(User.level, (User.experience_points + xp) // 100 + 1),
+            )
+            .returning(
+                User.total_correct_answers,
+                User.total_wrong_answers,
+                User.total_words_learned,
+                User.experience_points,
+                User.level,
+            )
+            .execution_options(synchronize_session=False)
         )
-        logger.info(f"Learned words query: {learned_words_query}")
-        # --------------------для отладки------------------------------------
-        learned_words_result = await session.execute(learned_words_query)
-        learned_words_count = learned_words_result.scalar()
 
-        logger.info(f"Found {learned_words_count} learned/mastered words for user {user_id}")
+    @staticmethod
+    async def get_theme_progress(
+        session: AsyncSession,
+        user_id: int,
+        theme_id: int
+    ) -> dict[int, WordStatus]:
+        """
+        Прогресс пользователя по всем словам темы одним запросом.
+        Загружается при старте квиза и дальше обновляется по ответам
+        (apply_progress_update), без запросов на каждый вопрос.
 
-        status_stats = await session.execute(
+        Returns:
+            dict {word_id: WordStatus}; слов без ответов в нем нет
+        """
+        result = await session.execute(
             select(
+                UserWordProgress.word_id,
                 UserWordProgress.status,
-                func.count(UserWordProgress.id)
+                UserWordProgress.correct_count,
+                UserWordProgress.wrong_count,
+                UserWordProgress.next_review_date
+            )
+            .join(Vocabulary, Vocabulary.id == UserWordProgress.word_id)
+            .where(
+                UserWordProgress.user_id == user_id,
+                Vocabulary.theme_id == theme_id
             )
-            .where(UserWordProgress.user_id == user_id)
-            .group_by(UserWordProgress.status)
         )
+        return {
+            word_id: WordStatus(status, correct_count or 0, wrong_count or 0, next_review_date)
+            for word_id, status, correct_count, wrong_count, next_review_date in result
+        }
 
-        status_counts = {row[0]: row[1] for row in status_stats}
-        logger.info(f"Detailed word status counts for user {user_id}: {status_counts}")
-
-        user.total_words_learned = learned_words_count
-        logger.info(f"Set total_words_learned to {learned_words_count}")
-        # --------------------конец для отладки------------------------------------
-
+    @staticmethod
+    def apply_progress_update(
+        progress: dict[int, WordStatus],
+        word_id: int,
+        update: WordProgressUpdate
+    ) -> None:
+        """Обновить карту прогресса значениями, которые вернул update_word_progress"""
+        progress[word_id] = WordStatus(
+            update.status,
+            update.correct_count,
+            update.wrong_count,
+            update.next_review_date
+        )
 
-        # Добавить опыт
-        user.experience_points += 10 if is_correct else 2
-        
-        # Проверить повышение уровня (каждые 100 очков = +1 уровень)
-        new_level = (user.experience_points // 100) + 1
-        if new_level > user.level:
-            user.level = new_level
-            logger.info(f"User {user_id} leveled up to {new_level}!")
-        
-        await session.commit()
-    
     @staticmethod
     async def save_training_session(
         session: AsyncSession,
@@ -305,7 +412,8 @@ class UserService:
         theme_id: int | None,
         correct_answers: int,
         wrong_answers: int,
-        duration_seconds: int | None = None
+        duration_seconds: int | None = None,
+        user: User | None = None
     ) -> TrainingSession:
         """
         Сохранить результаты тренировочной сессии.
@@ -318,6 +426,8 @@ class UserService:
             correct_answers: Количество правильных ответов
             wrong_answers: Количество неправильных ответов
             duration_seconds: Длительность сессии в секундах
+            user: Объект пользователя (опционально) - его счетчик
+                тренировок синхронизируется с результатом UPDATE
             
         Returns:
             Created TrainingSession object
@@ -342,17 +452,23 @@ class UserService:
             duration_seconds=duration_seconds
         )
         session.add(training)
-        
-        # Обновить счетчик тренировок у пользователя
+
+        # Обновить счетчик тренировок у пользователя без SELECT User
         result = await session.execute(
-            select(User).where(User.id == user_id)
+            update(User)
+            .where(User.id == user_id)
+            .values(total_trainings=User.total_trainings + 1)
+            .returning(User.total_trainings)
+            .execution_options(synchronize_session=False)
         )
-        user = result.scalar_one()
-        user.total_trainings += 1
-        
+        total_trainings = result.scalar_one()
+
         await session.commit()
         await session.refresh(training)
-        
+
+        if user is not None:
+            set_committed_value(user, 'total_trainings', total_trainings)
+
         logger.info(f"Saved training session for user {user_id}: {session_type}")
         
         return training
@@ -365,6 +481,9 @@ class UserService:
     ) -> list[Vocabulary]:
         """
         Получить слова для повторения (Spaced Repetition).
+        Слова, у которых наступил next_review_date (расписание SM-2,
+        см. services.srs), - сначала самые просроченные. Запрос идет
+        по частичному индексу ix_user_word_progress_due.
         
         Args:
             session: Database session
@@ -382,7 +501,7 @@ class UserService:
             .where(
                 UserWordProgress.user_id == user_id,
                 UserWordProgress.next_review_date <= now,
-                UserWordProgress.status.in_(['learning', 'learned'])
+                UserWordProgress.status.in_(srs.REVIEW_STATUSES)
             )
             .order_by(UserWordProgress.next_review_date)
             .limit(limit)
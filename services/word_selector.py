@@ -0,0 +1,186 @@
+"""
+Адаптивный выбор слова для вопроса квиза.
+
+Слово темы выбирается случайно с весом: чем чаще пользователь
+ошибается в слове, чем ниже его статус и если подошел срок повторения
+(SM-2) - тем чаще оно попадается. Освоенные слова почти не повторяются.
+
+Веса слов (user, theme) хранятся в дереве Фенвика: выбор слова
+и обновление веса после ответа - O(log n). Деревья живут в памяти
+процесса (LRU) и строятся из карты прогресса квиза, поэтому после
+перезапуска или на другой реплике просто строятся заново.
+"""
+import logging
+import random
+from collections import OrderedDict
+from datetime import datetime
+
+from services.quiz_pool import ThemePool
+from services.user_service import WordStatus
+from utils.datetime_utils import now_utc
+
+logger = logging.getLogger(__name__)
+
+# Множитель веса по статусу слова; слова без ответов считаются 'new'
+STATUS_WEIGHTS = {
+    'new': 1.0,
+    'learning': 0.8,
+    'learned': 0.4,
+    'mastered': 0.1,
+}
+# Множитель для слов, которым пора на повторение
+DUE_WEIGHT = 2.0
+
+
+def word_weight(progress: WordStatus | None, now: datetime) -> float:
+    """
+    Вес слова: множитель статуса * (0.5 + 2 * доля ошибок) * множитель срока.
+    Доля ошибок сглажена ((wrong + 1) / (total + 2)), так что у нового
+    слова она 0.5, а одна ошибка не делает вес максимальным.
+    """
+    if progress is None:
+        return STATUS_WEIGHTS['new'] * 1.5
+
+    error_rate = (progress.wrong_count + 1) / (progress.correct_count + progress.wrong_count + 2)
+    weight = STATUS_WEIGHTS.get(progress.status, 1.0) * (0.5 + 2 * error_rate)
+    if progress.next_review_date is not None and progress.next_review_date <= now:
+        weight *= DUE_WEIGHT
+    return weight
+
+
+class FenwickTree:
+    """Дерево Фенвика над неотрицательными весами с выбором по весу"""
+
+    def __init__(self, weights: list[float]):
+        self.weights = list(weights)
+        self._tree = [0.0] * (len(weights) + 1)
+        # Построение за O(n)
+        for i, weight in enumerate(self.weights, start=1):
+            self._tree[i] += weight
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+        self._top = 1 << (len(weights).bit_length() - 1) if weights else 0
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    @property
+    def total(self) -> float:
+        return self._prefix(len(self.weights))
+
+    def _prefix(self, count: int) -> float:
+        result = 0.0
+        while count > 0:
+            result += self._tree[count]
+            count -= count & -count
+        return result
+
+    def set(self, index: int, weight: float) -> None:
+        """Изменить вес элемента index"""
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def find(self, value: float) -> int:
+        """Индекс элемента, на который приходится value из [0, total)"""
+        position = 0
+        step = self._top
+        while step:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= value:
+                position = next_position
+                value -= self._tree[next_position]
+            step >>= 1
+        # Погрешность float может увести за последний элемент
+        return min(position, len(self.weights) - 1)
+
+    def sample(self) -> int:
+        """Случайный индекс с вероятностью, пропорциональной весу"""
+        return self.find(random.random() * self.total)
+
+
+class _ThemeSampler:
+    """Веса слов одной темы для одного пользователя"""
+
+    def __init__(self, pool: ThemePool, progress: dict[int, WordStatus], now: datetime):
+        self.pool = pool
+        self.tree = FenwickTree([
+            word_weight(progress.get(word_id), now) for word_id, _, _ in pool.words
+        ])
+
+    def pick(self, exclude_word_id: int | None) -> int:
+        # Слово прошлого вопроса на время выбора получает вес 0
+        excluded = self.pool.word_index.get(exclude_word_id) if exclude_word_id is not None else None
+        if excluded is not None and len(self.tree) > 1:
+            weight = self.tree.weights[excluded]
+            self.tree.set(excluded, 0.0)
+            try:
+                return self._sample()
+            finally:
+                self.tree.set(excluded, weight)
+        return self._sample()
+
+    def _sample(self) -> int:
+        if self.tree.total <= 0:
+            return random.randrange(len(self.tree))
+        return self.tree.sample()
+
+
+class WordSelector:
+    """Выбор слов квиза с весами по слабости пользователя"""
+
+    def __init__(self, max_samplers: int = 5000):
+        self.max_samplers = max_samplers
+        self._samplers: OrderedDict[tuple[int, int], _ThemeSampler] = OrderedDict()
+
+    def pick(
+        self,
+        user_id: int,
+        theme_id: int,
+        pool: ThemePool,
+        progress: dict[int, WordStatus],
+        exclude_word_id: int | None = None
+    ) -> int:
+        """
+        Выбрать слово темы.
+
+        Args:
+            user_id: User ID
+            theme_id: ID темы
+            pool: Слова темы из quiz_pool
+            progress: Карта прогресса темы (используется, если весов еще нет)
+            exclude_word_id: Слово прошлого вопроса - не повторять подряд
+
+        Returns:
+            Индекс слова в pool.words
+        """
+        key = (user_id, theme_id)
+        sampler = self._samplers.get(key)
+        # Пул перезагружен после импорта - индексы слов изменились
+        if sampler is None or sampler.pool is not pool:
+            sampler = _ThemeSampler(pool, progress, now_utc())
+            self._samplers[key] = sampler
+            while len(self._samplers) > self.max_samplers:
+                self._samplers.popitem(last=False)
+        self._samplers.move_to_end(key)
+        return sampler.pick(exclude_word_id)
+
+    def update(self, user_id: int, theme_id: int, word_id: int, progress: WordStatus) -> None:
+        """Пересчитать вес слова после ответа"""
+        sampler = self._samplers.get((user_id, theme_id))
+        if sampler is None:
+            return
+        index = sampler.pool.word_index.get(word_id)
+        if index is not None:
+            sampler.tree.set(index, word_weight(progress, now_utc()))
+
+    def discard(self, user_id: int, theme_id: int) -> None:
+        """Забыть веса (при старте квиза они строятся из свежей карты прогресса)"""
+        self._samplers.pop((user_id, theme_id), None)
+
+
+word_selector = WordSelector()
@@ -0,0 +1,29 @@
+from services.ai_health import AIHealthMonitor, RETRY_DELAYS
+
+
+def test_single_failure_does_not_mark_unavailable():
+    health = AIHealthMonitor(interval=300.0, failure_threshold=3)
+    health.record_failure("timeout")
+    health.record_failure("timeout")
+    assert health.is_available
+
+    health.record_failure("timeout")
+    assert not health.is_available
+
+    health.record_success()
+    assert health.is_available
+    assert health.consecutive_failures == 0
+
+
+def test_probe_backs_off_while_failing():
+    health = AIHealthMonitor(interval=300.0, failure_threshold=3)
+    assert health.next_delay() == 300.0
+
+    delays = []
+    for _ in range(5):
+        health.record_failure("timeout")
+        delays.append(health.next_delay())
+    assert delays == [*RETRY_DELAYS, RETRY_DELAYS[-1], RETRY_DELAYS[-1]]
+
+    health.record_success()
+    assert health.next_delay() == 300.0
@@ -0,0 +1,57 @@
+import random
+
+from services import distractor_index
+from services.distractor_index import NO_NEIGHBOR, build_neighbors, normalize
+
+
+def _vocabulary(n: int) -> list[str]:
+    """Переводы с общими частыми триграммами, как у настоящего словаря"""
+    rng = random.Random(1)
+    syllables = ['ка', 'ро', 'ни', 'для', 'ст', 'ва', 'ли', 'то', 'ме', 'ша', 'по', 'де']
+    texts = (
+        ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 7))) + f' для {i % 50}'
+        for i in range(n)
+    )
+    return list(dict.fromkeys(texts))
+
+
+def test_neighbors_are_distinct_and_never_contain_each_other():
+    texts = ['брат', 'брат, сестра', 'сестра', 'мать', 'отец', 'Мать', 'дочь']
+    k = 4
+    table = build_neighbors(texts, k)
+
+    assert len(table) == len(texts) * k
+    for i, text in enumerate(texts):
+        neighbors = [j for j in table[i * k:(i + 1) * k] if j != NO_NEIGHBOR]
+        assert i not in neighbors
+        assert len(set(neighbors)) == len(neighbors)
+        for j in neighbors:
+            assert not distractor_index.overlaps(normalize(text), normalize(texts[j]))
+
+
+def test_small_inputs():
+    assert len(build_neighbors([], 8)) == 0
+    assert list(build_neighbors(['один'], 3)) == [NO_NEIGHBOR] * 3
+    assert list(build_neighbors(['один', 'два'], 2)) == [1, NO_NEIGHBOR, 0, NO_NEIGHBOR]
+
+
+def test_work_per_text_is_bounded(monkeypatch):
+    # Кандидаты проверяются через overlaps: число проверок на перевод
+    # не должно расти с размером словаря
+    calls = 0
+    original = distractor_index.overlaps
+
+    def counting_overlaps(a: str, b: str) -> bool:
+        nonlocal calls
+        calls += 1
+        return original(a, b)
+
+    monkeypatch.setattr(distractor_index, 'overlaps', counting_overlaps)
+
+    k = 8
+    per_text_limit = distractor_index.MAX_CANDIDATES + k * distractor_index.LENGTH_STEPS_PER_NEIGHBOR
+    for n in (1000, 5000):
+        calls = 0
+        texts = _vocabulary(n)
+        build_neighbors(texts, k)
+        assert calls <= len(texts) * per_text_limit
@@ -0,0 +1,81 @@
+import asyncio
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from aiogram.fsm.storage.base import StorageKey
+
+from database.fsm_storage import PostgresStorage, from_json, to_json
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+class FakeSession:
+    """Сессия, которая только считает запросы"""
+
+    def __init__(self, statements: list):
+        self.statements = statements
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def one_or_none(self):
+        return None
+
+    async def commit(self):
+        pass
+
+
+def _storage() -> tuple[PostgresStorage, list]:
+    statements = []
+    return PostgresStorage(session_factory=lambda: FakeSession(statements)), statements
+
+
+def test_json_round_trip():
+    Status = namedtuple('Status', 'status correct_count next_review_date')
+    started = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+    data = {'started': started, 'progress': {7: Status('new', 1, None)}, 'options': ('a', 'b')}
+
+    assert from_json(to_json(data)) == {
+        'started': started,
+        'progress': {7: ['new', 1, None]},
+        'options': ['a', 'b'],
+    }
+    with pytest.raises(TypeError):
+        to_json({'bad': object()})
+
+
+def test_unreadable_data_is_treated_as_empty():
+    assert PostgresStorage._load('key', [1, 2]) == {}
+    assert PostgresStorage._load('key', {'__items__': 5}) == {}
+
+
+def test_scope_issues_one_select_and_one_write():
+    storage, statements = _storage()
+
+    async def handle():
+        async with storage.scope() as scope:
+            await storage.get_state(KEY)
+            await storage.get_data(KEY)
+            await storage.set_data(KEY, {'correct_count': 1})
+            await storage.get_data(KEY)
+            await storage.set_data(KEY, {'correct_count': 2})
+            await storage.set_state(KEY, 'Quiz:answer')
+        return scope
+
+    scope = asyncio.run(handle())
+
+    assert (scope.selects, scope.writes) == (1, 1)
+    assert len(statements) == 2
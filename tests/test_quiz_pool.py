@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.distractor_index import normalize, trigrams
+from services.quiz_pool import DISTRACTORS_COUNT, QuizPool
+
+
+def _pool(grouped: dict[int, list[tuple[int, str, str]]]) -> QuizPool:
+    pool = QuizPool()
+    pool._themes, pool._translations, pool._neighbors = QuizPool._build_index(grouped)
+    pool._loaded = True
+    return pool
+
+
+def test_small_theme_gets_similar_distractors_from_vocabulary():
+    # Тема из двух слов: недостающие дистракторы - похожие переводы других тем
+    similar = ['крошка', 'ложка', 'мошка', 'окошко', 'картошка', 'гармошка', 'кормушка', 'обложка', 'ношка']
+    other = ['яблоко', 'солнце', 'книга', 'дом', 'море', 'вода', 'хлеб', 'город', 'утро', 'небо']
+    grouped = {
+        1: [(1, 'gatto', 'кошка'), (2, 'cane', 'собака')],
+        2: [(10 + i, f'simile{i}', text) for i, text in enumerate(similar)],
+        3: [(30 + i, f'altro{i}', text) for i, text in enumerate(other)],
+    }
+    pool = _pool(grouped)
+    own = trigrams(normalize('кошка'))
+
+    for _ in range(20):
+        question = asyncio.run(pool.get_word_question(None, 1, 1))
+        distractors = set(question.options) - {'кошка'}
+        assert len(question.options) == len(set(question.options)) == DISTRACTORS_COUNT + 1
+        # 'собака' - из темы, остальные - похожие на 'кошка' по написанию
+        assert 'собака' in distractors
+        for text in distractors - {'собака'}:
+            assert own & trigrams(normalize(text))
+
+
+def test_tiny_vocabulary_falls_back_to_any_translation():
+    pool = _pool({1: [(1, 'gatto', 'кошка'), (2, 'cane', 'собака')]})
+
+    question = asyncio.run(pool.get_word_question(None, 1, 2))
+    assert sorted(question.options) == ['кошка', 'собака']
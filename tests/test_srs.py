@@ -0,0 +1,127 @@
+import math
+import operator
+from functools import reduce
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import Float, Integer, literal
+from sqlalchemy.sql import elements, functions, operators
+
+from model.model import UserWordProgress
+from services import srs
+from services.user_service import UserService
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+progress = UserWordProgress.__table__.c
+
+_OPERATORS = {
+    operators.add: operator.add,
+    operators.sub: operator.sub,
+    operators.mul: operator.mul,
+    operators.eq: operator.eq,
+    operators.ge: operator.ge,
+    operators.gt: operator.gt,
+    operators.lt: operator.lt,
+    operators.in_op: lambda value, options: value in options,
+    operators.and_: lambda *values: all(values),
+}
+_FUNCTIONS = {
+    'coalesce': lambda *values: next((value for value in values if value is not None), None),
+    'ceil': math.ceil,
+    'greatest': max,
+    'make_interval': lambda years, months, weeks, days: timedelta(days=days),
+}
+
+
+def evaluate(expression, row: dict):
+    """Вычислить SQL-выражение над значениями колонок строки (как это сделал бы PostgreSQL)"""
+    if isinstance(expression, elements.BindParameter):
+        return expression.effective_value
+    if isinstance(expression, elements.ColumnClause):
+        return row[expression.name]
+    if isinstance(expression, (elements.Grouping, elements.Label)):
+        return evaluate(expression.element, row)
+    if isinstance(expression, elements.Null):
+        return None
+    if isinstance(expression, elements.Cast):
+        value = evaluate(expression.clause, row)
+        if isinstance(expression.type, Integer):
+            return int(value)
+        if isinstance(expression.type, Float):
+            return float(value)
+        return value
+    if isinstance(expression, elements.Case):
+        for condition, result in expression.whens:
+            if evaluate(condition, row):
+                return evaluate(result, row)
+        return evaluate(expression.else_, row) if expression.else_ is not None else None
+    if isinstance(expression, functions.FunctionElement):
+        return _FUNCTIONS[expression.name](*(evaluate(clause, row) for clause in expression.clauses))
+    if isinstance(expression, elements.BinaryExpression):
+        left, right = evaluate(expression.left, row), evaluate(expression.right, row)
+        if left is None or right is None:
+            return None
+        return _OPERATORS[expression.operator](left, right)
+    if isinstance(expression, elements.BooleanClauseList):
+        return _OPERATORS[expression.operator](*(evaluate(clause, row) for clause in expression.clauses))
+    if isinstance(expression, elements.ExpressionClauseList):
+        # a + b + c - цепочка одного оператора
+        values = [evaluate(clause, row) for clause in expression.clauses]
+        return None if None in values else reduce(_OPERATORS[expression.operator], values)
+    raise TypeError(f"Unsupported expression: {type(expression).__name__}")
+
+
+SCHEDULE_CASES = [
+    # repetitions, easiness_factor, interval_days
+    (None, None, None),
+    (0, 2.5, 0),
+    (1, 2.5, 1),
+    (2, 2.36, 6),
+    (5, 1.3, 40),
+    (3, 1.35, 17),
+]
+
+
+@pytest.mark.parametrize("is_correct", [True, False])
+@pytest.mark.parametrize("repetitions, easiness_factor, interval_days", SCHEDULE_CASES)
+def test_schedule_sql_matches_schedule(repetitions, easiness_factor, interval_days, is_correct):
+    quality = srs.answer_quality(is_correct)
+    row = {'repetitions': repetitions, 'easiness_factor': easiness_factor, 'interval_days': interval_days}
+
+    expected = srs.schedule(repetitions, easiness_factor, interval_days, quality, NOW)
+    sql = srs.schedule_sql(progress.repetitions, progress.easiness_factor, progress.interval_days, quality, NOW)
+    actual = {name: evaluate(expression, row) for name, expression in sql.items()}
+
+    assert actual['repetitions'] == expected.repetitions
+    assert actual['easiness_factor'] == pytest.approx(expected.easiness_factor)
+    assert actual['interval_days'] == expected.interval_days
+    assert actual['next_review_date'] == expected.next_review_date
+
+
+@pytest.mark.parametrize("old_status, correct_count, wrong_count, is_correct, status, learned_delta", [
+    # Первый ответ на слово: строка создается со статусом 'new'
+    (None, 0, 0, True, 'new', 0),
+    ('new', 2, 0, True, 'learning', 0),
+    ('learning', 6, 1, True, 'learned', 1),
+    ('learning', 6, 1, False, 'learning', 0),
+    ('learned', 7, 1, True, 'learned', 0),
+    # Ошибка не понижает статус - счетчик выученных не меняется
+    ('learned', 7, 1, False, 'learned', 0),
+    ('learned', 14, 1, True, 'mastered', 0),
+])
+def test_status_transitions_and_learned_delta(old_status, correct_count, wrong_count, is_correct, status, learned_delta):
+    row = {'status': old_status, 'correct_count': correct_count, 'wrong_count': wrong_count}
+    if old_status is None:
+        new_status = literal('new')
+    else:
+        new_correct = progress.correct_count + int(is_correct)
+        new_wrong = progress.wrong_count + int(not is_correct)
+        new_status = literal(evaluate(UserService._next_status(progress.status, new_correct, new_wrong), row))
+
+    delta = UserService._is_learned(new_status) - UserService._is_learned(literal(old_status))
+
+    assert evaluate(new_status, row) == status
+    assert evaluate(delta, row) == learned_delta
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from aiogram.exceptions import TelegramBadRequest
+
+from utils.streaming import INTERRUPTED_MARK, StreamInterrupted, markdown_to_html, stream_to_message
+
+# Маркеры вложены крест-накрест - теги тоже, такой HTML Telegram не принимает
+MALFORMED = "**_важно**_ слово"
+
+
+def _is_valid_html(text: str) -> bool:
+    opened = []
+    for tag in ("".join(part.split(">")[0]) for part in text.split("<")[1:]):
+        if tag.startswith("/"):
+            if not opened or opened.pop() != tag[1:]:
+                return False
+        else:
+            opened.append(tag)
+    return not opened
+
+
+class FakeMessage:
+    """Сообщение, которое, как Telegram, отклоняет неправильно вложенный HTML"""
+
+    def __init__(self):
+        self.text: str | None = None
+        self.parse_mode = "HTML"
+        self.sent: list[FakeMessage] = []
+
+    def _check(self, text: str, parse_mode) -> None:
+        if parse_mode is not None and not _is_valid_html(text):
+            raise TelegramBadRequest(method=None, message="Bad Request: can't parse entities")
+
+    async def answer(self, text: str, reply_markup=None, parse_mode="HTML"):
+        self._check(text, parse_mode)
+        reply = FakeMessage()
+        reply.text, reply.parse_mode = text, parse_mode
+        self.sent.append(reply)
+        return reply
+
+    async def edit_text(self, text: str, parse_mode="HTML"):
+        self._check(text, parse_mode)
+        self.text, self.parse_mode = text, parse_mode
+
+
+async def _chunks(*texts: str, fail: bool = False):
+    for text in texts:
+        yield text
+    if fail:
+        raise StreamInterrupted("connection reset")
+
+
+def test_markdown_to_html():
+    assert markdown_to_html("**a** *b* `**c**` <d>") == "<b>a</b> <i>b</i> <code>**c**</code> &lt;d&gt;"
+    assert not _is_valid_html(markdown_to_html(MALFORMED))
+
+
+def test_malformed_markdown_falls_back_to_plain_text():
+    message = FakeMessage()
+    result = asyncio.run(stream_to_message(message, _chunks(MALFORMED), min_interval=0))
+
+    assert result == MALFORMED
+    [sent] = message.sent
+    assert sent.parse_mode is None
+    assert sent.text == "важно слово"
+
+
+def test_interrupted_stream_is_marked():
+    message = FakeMessage()
+    asyncio.run(stream_to_message(message, _chunks("**При**", "**Привет**", fail=True), min_interval=0))
+
+    [sent] = message.sent
+    assert sent.text == "<b>Привет</b>" + INTERRUPTED_MARK
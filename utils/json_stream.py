@@ -0,0 +1,102 @@
+"""
+Потоковый разбор больших JSON-файлов.
+
+Файл читается кусками, элементы верхнего уровня разбираются по одному
+через JSONDecoder.raw_decode - весь документ в памяти не собирается.
+Поддерживаются объект верхнего уровня ({ключ: значение, ...})
+и массив ([элемент, ...]).
+"""
+import json
+from typing import Any, Iterator, TextIO
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Буфер поверх файла с разбором значений через raw_decode"""
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Отбрасываем уже разобранную часть буфера
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Следующий непробельный символ ('' в конце файла)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read_more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Разобрать следующее значение, дочитывая файл при необходимости"""
+        self.peek()
+        while True:
+            try:
+                result, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # Число на границе буфера может продолжаться в следующем куске
+            if end == len(self.buf) and not self.eof and self._read_more():
+                continue
+            self.pos = end
+            return result
+
+
+def iter_object_items(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, Any]]:
+    """Пары (ключ, значение) объекта верхнего уровня"""
+    reader = _Reader(file, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        yield key, reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
+
+
+def iter_array_items(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Элементы массива верхнего уровня"""
+    reader = _Reader(file, chunk_size)
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("]")
+        return
@@ -15,6 +15,7 @@ async def set_commands(bot: Bot):
         BotCommand(command="conversation", description="💬 Практика диалога (AI)"),
         BotCommand(command="exercise", description="📝 Упражнения (AI)"),
         BotCommand(command='train', description='📝 Тренируем слова'),
+        BotCommand(command='review', description='🔁 Повторение слов'),
         BotCommand(command="ai_status", description="🔍 Статус AI"),
     ]
     await bot.set_my_commands(commands)
@@ -0,0 +1,143 @@
+"""
+Профилирование запуска бота.
+
+Включается переменной окружения APP_STARTUP_PROFILE=1. Тогда:
+- время импорта каждого модуля (собственное и вместе с вложенными импортами);
+- время фаз запуска (profiler.phase("...")).
+В конце запуска в лог выводится отчет. Без переменной окружения
+модуль ничего не перехватывает, а phase() только отмеряет время фазы.
+
+Модуль использует только стандартную библиотеку, чтобы его можно было
+импортировать первым.
+"""
+import importlib.abc
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("APP_STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+class _TimingLoader(importlib.abc.Loader):
+    """Обертка над загрузчиком модуля, замеряющая exec_module"""
+
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter_import()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit_import(module.__name__, time.perf_counter() - started)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Находит модуль остальными finder'ами и подменяет загрузчик на замеряющий"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimingLoader(spec.loader, self._profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """Время импортов и фаз запуска"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        # модуль -> (время вместе с вложенными импортами, собственное время)
+        self.imports: dict[str, tuple[float, float]] = {}
+        self.phases: list[tuple[str, float]] = []
+        # Время вложенных импортов для каждого уровня вложенности;
+        # стек свой у каждого потока - импорты идут и из asyncio.to_thread
+        self._local = threading.local()
+        self._finder: _TimingFinder | None = None
+
+    def install(self) -> None:
+        """Начать замер импортов"""
+        if self.enabled and self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self) -> None:
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    @property
+    def _children(self) -> list[float]:
+        stack = getattr(self._local, "children", None)
+        if stack is None:
+            stack = self._local.children = []
+        return stack
+
+    def _enter_import(self) -> None:
+        self._children.append(0.0)
+
+    def _exit_import(self, name: str, elapsed: float) -> None:
+        stack = self._children
+        children = stack.pop()
+        self.imports[name] = (elapsed, elapsed - children)
+        if stack:
+            stack[-1] += elapsed
+
+    @contextmanager
+    def phase(self, name: str):
+        """Замерить фазу запуска"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases.append((name, elapsed))
+            if self.enabled:
+                logger.info(f"Startup phase '{name}': {elapsed * 1000:.1f} ms")
+
+    def report(self, top: int = 25) -> None:
+        """Вывести отчет в лог"""
+        if not self.enabled:
+            return
+        self.uninstall()
+
+        total = time.perf_counter() - self.started
+        lines = [f"Startup profile: {total * 1000:.1f} ms total"]
+
+        lines.append("Phases:")
+        for name, elapsed in self.phases:
+            lines.append(f"  {elapsed * 1000:9.1f} ms  {name}")
+
+        lines.append(f"Slowest imports (cumulative / self), top {top}:")
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (cumulative, own) in slowest:
+            lines.append(f"  {cumulative * 1000:9.1f} ms {own * 1000:9.1f} ms  {name}")
+
+        logger.info("\n".join(lines))
+
+
+profiler = StartupProfiler(ENABLED)
+profiler.install()
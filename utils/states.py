@@ -3,4 +3,5 @@ from aiogram.fsm.state import StatesGroup, State
 class Quiz(StatesGroup):
     idiom = State()
     no_quiz = State()
-    quiz_start = State()
\ No newline at end of file
+    quiz_start = State()
+    review = State()
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Потоковая отправка ответов AI в Telegram.
+
+Первый фрагмент отправляется обычным сообщением, дальше сообщение
+дописывается через edit_message_text не чаще min_interval секунд
+(Telegram ограничивает частоту редактирования сообщений).
+
+Модель отвечает в Markdown, бот шлет HTML: текст экранируется,
+а **жирный**, *курсив*, `код` и заголовки переводятся в теги.
+Если поток оборвался (StreamInterrupted), к показанному тексту
+добавляется пометка INTERRUPTED_MARK. Если Telegram не принял HTML
+(например, маркеры вложены крест-накрест: **_текст**_), сообщение
+отправляется или редактируется обычным текстом без разметки.
+"""
+import asyncio
+import html
+import logging
+import re
+import time
+from typing import AsyncIterator
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Максимальная длина текста сообщения в Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+# Минимальный интервал между редактированиями одного сообщения, сек
+EDIT_INTERVAL = 1.5
+
+INTERRUPTED_MARK = "\n\n⚠️ ответ прерван"
+
+_MARKDOWN = (
+    (re.compile(r"^#{1,6}\s*(.+?)\s*#*$", re.MULTILINE), r"<b>\1</b>"),
+    (re.compile(r"\*\*(.+?)\*\*"), r"<b>\1</b>"),
+    (re.compile(r"__(.+?)__"), r"<b>\1</b>"),
+    (re.compile(r"(?<![\w*])\*(?![\s*])(.+?)(?<![\s*])\*(?![\w*])"), r"<i>\1</i>"),
+    (re.compile(r"(?<!\w)_(?![\s_])(.+?)(?<![\s_])_(?!\w)"), r"<i>\1</i>"),
+)
+_CODE = re.compile(r"`([^`\n]+)`")
+_TAG = re.compile(r"<[^>]+>")
+
+
+class StreamInterrupted(Exception):
+    """Поток ответа оборвался - уже выданный текст неполный"""
+
+
+def markdown_to_html(text: str) -> str:
+    """
+    Перевести Markdown ответа модели в HTML Telegram.
+    Незакрытые маркеры (текст еще дописывается) остаются как есть.
+    """
+    parts = _CODE.split(html.escape(text, quote=False))
+    # Нечетные части - содержимое `код`, его не форматируем
+    for i in range(0, len(parts), 2):
+        for pattern, replacement in _MARKDOWN:
+            parts[i] = pattern.sub(replacement, parts[i])
+    for i in range(1, len(parts), 2):
+        parts[i] = f"<code>{parts[i]}</code>"
+    return "".join(parts)
+
+
+def html_to_plain(rendered: str) -> str:
+    """Текст сообщения без HTML-разметки (для parse_mode=None)"""
+    return html.unescape(_TAG.sub("", rendered))
+
+
+def _render(header: str, text: str, cursor: bool = False, interrupted: bool = False) -> str:
+    suffix = (" ▌" if cursor else "") + (INTERRUPTED_MARK if interrupted else "")
+    rendered = header + markdown_to_html(text) + suffix
+    if len(rendered) <= MAX_MESSAGE_LENGTH:
+        return rendered
+
+    # Обрезаем исходный текст, а не HTML - чтобы не разрезать тег.
+    # Самый длинный префикс, который после перевода в HTML помещается в лимит
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(header + markdown_to_html(text[:middle] + "…") + suffix) <= MAX_MESSAGE_LENGTH:
+            low = middle
+        else:
+            high = middle - 1
+    return header + markdown_to_html(text[:low] + "…") + suffix
+
+
+async def stream_to_message(
+    message: Message,
+    chunks: AsyncIterator[str],
+    header: str = "",
+    reply_markup=None,
+    min_interval: float = EDIT_INTERVAL
+) -> str:
+    """
+    Отправить ответ, постепенно дописывая его по мере генерации.
+
+    Args:
+        message: Сообщение пользователя, на которое отвечаем
+        chunks: Поток накопленного текста (каждый элемент - весь текст на данный момент);
+            обрыв генерации - исключение StreamInterrupted
+        header: HTML-заголовок перед текстом
+        reply_markup: Клавиатура для первого сообщения
+        min_interval: Минимальный интервал между редактированиями, сек
+
+    Returns:
+        Итоговый текст ответа (пустая строка, если ничего не пришло,
+        в том числе если поток оборвался до первого фрагмента)
+    """
+    sent: Message | None = None
+    text = ""
+    shown = ""
+    last_edit = 0.0
+    interrupted = False
+
+    try:
+        async for text in chunks:
+            now = time.monotonic()
+
+            if sent is None:
+                shown = _render(header, text, cursor=True)
+                sent = await _send(message, shown, reply_markup)
+                last_edit = now
+                continue
+
+            if now - last_edit < min_interval:
+                continue
+
+            shown = await _edit(sent, _render(header, text, cursor=True), shown)
+            last_edit = time.monotonic()
+    except StreamInterrupted as e:
+        logger.warning(f"Streamed answer interrupted: {e}")
+        interrupted = True
+
+    if sent is None:
+        return ""
+
+    await _edit(sent, _render(header, text, interrupted=interrupted), shown, final=True)
+    return text
+
+
+async def _send(message: Message, rendered: str, reply_markup) -> Message:
+    """Отправить первое сообщение; если HTML не принят - обычным текстом"""
+    try:
+        return await message.answer(rendered, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        logger.warning(f"Telegram rejected streamed HTML, sending plain text: {e}")
+        return await message.answer(html_to_plain(rendered), reply_markup=reply_markup, parse_mode=None)
+
+
+async def _edit(sent: Message, rendered: str, shown: str, final: bool = False) -> str:
+    """Отредактировать сообщение; возвращает текст, который теперь показан"""
+    if rendered == shown:
+        return shown
+
+    try:
+        await sent.edit_text(rendered)
+        return rendered
+    except TelegramRetryAfter as e:
+        logger.warning(f"Edit rate limit hit, retry after {e.retry_after}s")
+        if final:
+            # Итоговый текст обязательно должен дойти до пользователя
+            await asyncio.sleep(e.retry_after)
+            return await _edit(sent, rendered, shown, final=True)
+        # Промежуточное обновление пропускаем - следующее придет позже
+    except TelegramBadRequest as e:
+        logger.warning(f"Telegram rejected streamed HTML, editing as plain text: {e}")
+        try:
+            await sent.edit_text(html_to_plain(rendered), parse_mode=None)
+            return rendered
+        except TelegramRetryAfter as retry:
+            logger.warning(f"Edit rate limit hit, retry after {retry.retry_after}s")
+            if final:
+                await asyncio.sleep(retry.retry_after)
+                return await _edit(sent, rendered, shown, final=True)
+        except TelegramBadRequest as plain_error:
+            logger.warning(f"Failed to edit streamed message: {plain_error}")
+    return shown
@@ -0,0 +1,72 @@
+"""
+Запуск бота в режиме webhook (aiohttp) вместо long polling.
+
+Telegram присылает обновления на settings.webhook.url; сервер слушает
+settings.run.host:settings.run.port. Запускать нужно одну реплику:
+обновления одного пользователя упорядочивает UpdateSchedulerMiddleware
+внутри процесса, и несколько реплик за балансировщиком портили бы
+данные FSM (см. middleware.scheduler_middleware). Запрос проверяется по секретному токену, ответ 200
+отдается сразу, а обработка идет в фоне; в работе и в очереди - не больше
+max_pending_updates обновлений. Параллельность и очередность обработки
+задает UpdateSchedulerMiddleware: глобальный лимит берется только после
+очереди пользователя, чтобы один активный пользователь не занял все слоты.
+"""
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from db_config.db_config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """SimpleRequestHandler с ограничением очереди фоновой обработки"""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_pending_updates: int, **kwargs):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self.max_pending_updates = max_pending_updates
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if len(self._background_feed_update_tasks) >= self.max_pending_updates:
+            # Telegram повторит доставку позже
+            logger.warning("Webhook backlog is full, asking Telegram to retry")
+            return web.Response(status=429)
+        return await super().handle(request)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """Поднять aiohttp-сервер и зарегистрировать webhook; работает до отмены"""
+    config = settings.webhook
+
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.secret,
+        max_pending_updates=config.max_pending_updates,
+    ).register(app, path=config.path)
+    # startup/shutdown диспетчера вызываются вместе с приложением
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.run.host, port=settings.run.port)
+    await site.start()
+    logger.info(f"Webhook server listening on {settings.run.host}:{settings.run.port}{config.path}")
+
+    try:
+        # Регистрация идемпотентна - перезапуск ее просто повторяет.
+        # Обновления, накопленные за время перезапуска, не сбрасываем
+        await bot.set_webhook(
+            url=config.url,
+            secret_token=config.secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=config.max_connections,
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()